@@ -0,0 +1,271 @@
+"""
+Benchmark harness for the extraction and parsing hot paths.
+
+    python benchmarks/run_benchmarks.py --scale small
+    python benchmarks/run_benchmarks.py --scale medium --save-baseline
+    python benchmarks/run_benchmarks.py --scale medium          # compare against baseline
+
+Every stage runs in its own child process so peak RSS is measured per stage.
+Synthetic evidence is generated once per (scale, seed) and reused.
+
+Timings depend on the host, so no baseline is committed. benchmarks/baseline.json
+is created by --save-baseline on the machine that runs the comparison (record it
+from a known-good commit); without it, a run only prints its report.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import multiprocessing
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import SCALES, build_corpus
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def _dir_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+# Each stage returns (units processed, unit name) for one iteration
+
+def stage_probe_raw(corpus, scratch):
+    from src.core.vhd_manager import EvidenceManager
+    manager = EvidenceManager(corpus['raw'], workspace_base=scratch)
+    assert manager.fs_info is not None, "no filesystem found"
+    return 1, "images"
+
+
+def stage_probe_vhd(corpus, scratch):
+    from src.core.vhd_manager import EvidenceManager
+    manager = EvidenceManager(corpus['vhd'], workspace_base=scratch)
+    assert manager.fs_info is not None, "no filesystem found"
+    return 1, "images"
+
+
+def stage_extract_tree(corpus, scratch):
+    """Recursive _extract_dir over the whole Users tree"""
+    from src.core.vhd_manager import EvidenceManager
+    manager = EvidenceManager(corpus['raw'], workspace_base=scratch)
+    manager.extract_single_target("Users")
+    return _dir_bytes(manager.workspace), "bytes"
+
+
+def stage_extract_large(corpus, scratch):
+    """_save_entry on a single large hive"""
+    from src.core.vhd_manager import EvidenceManager
+    manager = EvidenceManager(corpus['vhd'], workspace_base=scratch)
+    manager.extract_single_target("Windows/System32/config/SOFTWARE")
+    return _dir_bytes(manager.workspace), "bytes"
+
+
+def stage_parse_evtx(corpus, scratch):
+    from src.core.sid_mapper import SIDMapper
+    SIDMapper().parse_evtx_file(corpus['evtx'], "bench")
+    return corpus['params']['evtx_records'], "records"
+
+
+def stage_edge_parse(corpus, scratch):
+    from src.parser.edge_history_parser import EdgeHistoryParser
+    history = os.path.join(scratch, "History")
+    shutil.copy2(corpus['history'], history)
+    return len(EdgeHistoryParser().parse(history)), "rows"
+
+
+def stage_pecmd_csv(corpus, scratch):
+    from src.parser.prefetch_parser import PrefetchParser
+    return len(PrefetchParser().load_pecmd_csv(corpus['pecmd_dir'])), "rows"
+
+
+STAGES = {
+    'probe_raw': stage_probe_raw,
+    'probe_vhd': stage_probe_vhd,
+    'extract_tree': stage_extract_tree,
+    'extract_large': stage_extract_large,
+    'parse_evtx': stage_parse_evtx,
+    'edge_parse': stage_edge_parse,
+    'pecmd_csv': stage_pecmd_csv,
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _stage_worker(name, corpus, workdir, repeat, queue):
+    """Runs in a child process: time `repeat` iterations of one stage"""
+    latencies = []
+    units = 0
+    unit = ""
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(repeat):
+                scratch = tempfile.mkdtemp(prefix=f"{name}-", dir=workdir)
+                try:
+                    start = time.perf_counter()
+                    units, unit = STAGES[name](corpus, scratch)
+                    latencies.append(time.perf_counter() - start)
+                finally:
+                    shutil.rmtree(scratch, ignore_errors=True)
+        from src.core.metrics import metrics
+        queue.put({'latencies': latencies, 'units': units, 'unit': unit, 'peak_rss_mb': peak_rss_mb(),
+                   'counters': metrics.snapshot()['counters']})
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def run_stage(name, corpus, workdir, repeat):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_stage_worker, args=(name, corpus, workdir, repeat, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    if 'error' in result:
+        return {'error': result['error']}
+
+    latencies = result['latencies']
+    median = percentile(latencies, 50)
+    return {
+        'iterations': len(latencies),
+        'unit': result['unit'],
+        'units_per_iteration': result['units'],
+        'throughput': result['units'] / median if median else None,
+        'latency_ms': {
+            'min': min(latencies) * 1000,
+            'p50': median * 1000,
+            'p95': percentile(latencies, 95) * 1000,
+            'p99': percentile(latencies, 99) * 1000,
+            'max': max(latencies) * 1000,
+        },
+        'peak_rss_mb': result['peak_rss_mb'],
+        'counters': result['counters'],
+    }
+
+
+def compare(report, baseline, tolerance):
+    """List of human-readable regressions against a stored baseline"""
+    regressions = []
+    if baseline.get('scale') != report['scale']:
+        return [f"baseline scale {baseline.get('scale')} != {report['scale']}; not comparable"]
+
+    for name, current in report['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if not base or 'error' in base or 'error' in current:
+            continue
+        if base['throughput'] and current['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {current['throughput']:.1f} < baseline "
+                               f"{base['throughput']:.1f} {current['unit']}/s")
+        if current['latency_ms']['p95'] > base['latency_ms']['p95'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['latency_ms']['p95']:.1f} ms > baseline "
+                               f"{base['latency_ms']['p95']:.1f} ms")
+        if base.get('peak_rss_mb') and current.get('peak_rss_mb') and \
+                current['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{name}: peak RSS {current['peak_rss_mb']:.0f} MB > baseline "
+                               f"{base['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def print_report(report):
+    print(f"\n{'stage':<15}{'throughput':>20}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}{'peak RSS MB':>14}")
+    for name, r in report['stages'].items():
+        if 'error' in r:
+            print(f"{name:<15}  ERROR {r['error']}")
+            continue
+        if r['unit'] == "bytes":
+            throughput = f"{r['throughput'] / (1024 * 1024):.1f} MB/s"
+        else:
+            throughput = f"{r['throughput']:.1f} {r['unit']}/s"
+        lat = r['latency_ms']
+        rss = f"{r['peak_rss_mb']:.0f}" if r['peak_rss_mb'] is not None else "n/a"
+        print(f"{name:<15}{throughput:>20}{lat['p50']:>12.1f}{lat['p95']:>12.1f}{lat['p99']:>12.1f}{rss:>14}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark extraction and parsing hot paths on synthetic evidence")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--stages", nargs="+", choices=sorted(STAGES), default=list(STAGES))
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "vdi_bench"))
+    parser.add_argument("--logon-ratio", type=float, help="share of 4624 events in the synthetic Security.evtx")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression (default 0.2)")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    overrides = {}
+    if args.logon_ratio is not None:
+        overrides['logon_ratio'] = args.logon_ratio
+
+    os.makedirs(args.workdir, exist_ok=True)
+    print(f"[INFO] Preparing synthetic corpus ({args.scale}, seed {args.seed}) in {args.workdir}")
+    corpus = build_corpus(args.workdir, args.scale, args.seed, **overrides)
+
+    report = {
+        'scale': args.scale,
+        'seed': args.seed,
+        'params': corpus['params'],
+        'host': {'platform': platform.platform(), 'python': platform.python_version(),
+                 'cpus': os.cpu_count()},
+        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'stages': {},
+    }
+    for name in args.stages:
+        print(f"[INFO] Running {name} x{args.repeat}")
+        report['stages'][name] = run_stage(name, corpus, args.workdir, args.repeat)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Baseline saved: {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("\n[REGRESSION] " + "\n[REGRESSION] ".join(regressions))
+            return 1
+        print("\n[INFO] No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,633 @@
+"""
+Synthetic evidence generators for the benchmark suite.
+
+Everything is produced locally with the standard library: FAT16 disk images
+with an MBR and a Windows-like directory tree, fixed VHD wrappers, Security.evtx
+logs with a configurable share of 4624 events, Edge History databases and
+PECmd CSV output. The same seed always produces byte-identical files.
+"""
+import os
+import csv
+import uuid
+import random
+import struct
+import sqlite3
+import zlib
+from datetime import datetime, timedelta
+
+# --------------------------------------------------------------------------
+# EVTX
+# --------------------------------------------------------------------------
+
+EVTX_CHUNK_SIZE = 0x10000
+EVTX_HEADER_SIZE = 0x1000
+CHUNK_HEADER_SIZE = 0x200
+FILETIME_EPOCH = datetime(1601, 1, 1)
+
+# Substitution slots used by the single record template
+EVTX_FIELDS = ['EventID', 'SystemTime', 'EventRecordID', 'Computer',
+               'TargetUserSid', 'TargetUserName', 'TargetDomainName',
+               'TargetLogonId', 'LogonType', 'IpAddress']
+
+
+def _filetime(when):
+    return int((when - FILETIME_EPOCH).total_seconds() * 10 ** 7)
+
+
+def _name_hash(name):
+    value = 0
+    for ch in name:
+        value = (value * 65599 + ord(ch)) & 0xFFFFFFFF
+    return value & 0xFFFF
+
+
+class _ChunkTemplateWriter:
+    """Binary XML writer that tracks chunk-relative offsets of inline names"""
+
+    def __init__(self, base):
+        self.base = base
+        self.buf = bytearray()
+        self.names = {}
+
+    @property
+    def pos(self):
+        return self.base + len(self.buf)
+
+    def _name_ref(self):
+        """Reserve the name-offset dword; returns a callback that writes the name"""
+        slot = len(self.buf)
+        self.buf += b"\0\0\0\0"
+
+        def write(name):
+            if name in self.names:
+                struct.pack_into("<I", self.buf, slot, self.names[name])
+                return
+            offset = self.pos
+            self.names[name] = offset
+            struct.pack_into("<I", self.buf, slot, offset)
+            encoded = name.encode("utf-16-le")
+            self.buf += struct.pack("<IHH", 0, _name_hash(name), len(name)) + encoded + b"\0\0"
+        return write
+
+    def element(self, name, attrs=(), content=None):
+        """attrs: [(name, value)], value/content: str literal or int substitution index"""
+        start = len(self.buf)
+        self.buf += bytes([0x41 if attrs else 0x01]) + struct.pack("<H", 0xFFFF)
+        size_slot = len(self.buf)
+        self.buf += b"\0\0\0\0"
+        self._name_ref()(name)
+
+        attr_slot = None
+        if attrs:
+            attr_slot = len(self.buf)
+            self.buf += b"\0\0\0\0"
+            attr_start = len(self.buf)
+            for i, (attr_name, value) in enumerate(attrs):
+                self.buf.append(0x46 if i < len(attrs) - 1 else 0x06)
+                self._name_ref()(attr_name)
+                self._value(value)
+            struct.pack_into("<I", self.buf, attr_slot, len(self.buf) - attr_start)
+
+        if content is None:
+            self.buf.append(0x03)
+        else:
+            self.buf.append(0x02)
+            if callable(content):
+                content()
+            else:
+                self._value(content)
+            self.buf.append(0x04)
+        struct.pack_into("<I", self.buf, size_slot, len(self.buf) - size_slot - 4)
+        return start
+
+    def _value(self, value):
+        if isinstance(value, int):
+            self.buf += struct.pack("<BHB", 0x0D, value, 0x01)
+        else:
+            self.buf += struct.pack("<BBH", 0x05, 0x01, len(value)) + value.encode("utf-16-le")
+
+
+def _security_template(base):
+    w = _ChunkTemplateWriter(base)
+    w.buf += b"\x0f\x01\x01\x00"
+
+    def system():
+        w.element("Provider", [("Name", "Microsoft-Windows-Security-Auditing")])
+        w.element("EventID", content=0)
+        w.element("TimeCreated", [("SystemTime", 1)])
+        w.element("EventRecordID", content=2)
+        w.element("Channel", content="Security")
+        w.element("Computer", content=3)
+
+    def event_data():
+        for index, name in enumerate(EVTX_FIELDS[4:], start=4):
+            w.element("Data", [("Name", name)], content=index)
+
+    def event():
+        w.element("System", content=system)
+        w.element("EventData", content=event_data)
+
+    w.element("Event", [("xmlns", "http://schemas.microsoft.com/win/2004/08/events/event")], content=event)
+    w.buf.append(0x00)
+    return bytes(w.buf), w.names
+
+
+def _substitutions(values):
+    encoded = [str(v).encode("utf-16-le") for v in values]
+    out = struct.pack("<I", len(encoded))
+    for data in encoded:
+        out += struct.pack("<HBB", len(data), 0x01, 0x00)
+    return out + b"".join(encoded)
+
+
+class EvtxWriter:
+    """
+    Minimal EVTX writer: one resident template per chunk, string and template
+    hash tables filled in, and all header/data CRC32s computed, so both
+    python-evtx and Windows tooling accept the output.
+    """
+
+    TEMPLATE_ID = 0x1624
+
+    def __init__(self, path):
+        self.path = path
+        self.chunks = []
+        self.next_record = 1
+        self._chunk = None
+
+    def _new_chunk(self):
+        self._chunk = {'data': bytearray(CHUNK_HEADER_SIZE), 'first': self.next_record,
+                       'last': None, 'last_offset': 0, 'template': None, 'names': {}}
+        self.chunks.append(self._chunk)
+
+    def _record_bytes(self, chunk, record_num, when, values):
+        offset = len(chunk['data'])
+        body = bytearray(b"\x0f\x01\x01\x00")
+        if chunk['template'] is None:
+            # TemplateInstance (10 bytes) followed by the resident TemplateNode
+            template_offset = offset + 0x18 + 4 + 10
+            template_body, names = _security_template(template_offset + 0x18)
+            body += struct.pack("<BBII", 0x0C, 0x01, self.TEMPLATE_ID, template_offset)
+            guid = struct.pack("<I", self.TEMPLATE_ID) + uuid.UUID(int=self.TEMPLATE_ID).bytes[4:]
+            body += struct.pack("<I", 0) + guid + struct.pack("<I", len(template_body)) + template_body
+            chunk['template'] = template_offset
+            chunk['names'] = names
+        else:
+            body += struct.pack("<BBII", 0x0C, 0x01, self.TEMPLATE_ID, chunk['template'])
+        body += _substitutions(values)
+
+        size = 0x18 + len(body) + 4
+        pad = (-size) % 8
+        size += pad
+        return (b"\x2a\x2a\x00\x00" + struct.pack("<IQQ", size, record_num, _filetime(when))
+                + bytes(body) + b"\0" * pad + struct.pack("<I", size))
+
+    def add(self, when, values):
+        """values: one string per EVTX_FIELDS entry; the EventRecordID slot is filled in here"""
+        if self._chunk is None:
+            self._new_chunk()
+        record_num = self.next_record
+        values = list(values)
+        values[2] = str(record_num)
+        record = self._record_bytes(self._chunk, record_num, when, values)
+        if len(self._chunk['data']) + len(record) > EVTX_CHUNK_SIZE:
+            self._new_chunk()
+            record = self._record_bytes(self._chunk, record_num, when, values)
+
+        self._chunk['last_offset'] = len(self._chunk['data'])
+        self._chunk['data'] += record
+        self._chunk['last'] = record_num
+        self.next_record += 1
+
+    def _finish_chunk(self, chunk):
+        data = chunk['data']
+        free_offset = len(data)
+        data += b"\0" * (EVTX_CHUNK_SIZE - len(data))
+
+        # String table: 64 buckets chained through NameStringNode.next_offset
+        buckets = {}
+        for name, offset in sorted(chunk['names'].items(), key=lambda item: item[1]):
+            bucket = _name_hash(name) % 64
+            if bucket in buckets:
+                struct.pack_into("<I", data, buckets[bucket], offset)
+            else:
+                struct.pack_into("<I", data, 0x80 + bucket * 4, offset)
+            buckets[bucket] = offset
+        if chunk['template'] is not None:
+            struct.pack_into("<I", data, 0x180 + (self.TEMPLATE_ID % 32) * 4, chunk['template'])
+
+        struct.pack_into("<8sQQQQIII", data, 0, b"ElfChnk\0",
+                         chunk['first'], chunk['last'], chunk['first'], chunk['last'],
+                         0x80, chunk['last_offset'], free_offset)
+        struct.pack_into("<I", data, 0x34, zlib.crc32(bytes(data[CHUNK_HEADER_SIZE:free_offset])))
+        struct.pack_into("<I", data, 0x7C, zlib.crc32(bytes(data[:0x78]) + bytes(data[0x80:CHUNK_HEADER_SIZE])))
+        return bytes(data)
+
+    def close(self):
+        chunks = [c for c in self.chunks if c['last'] is not None]
+        header = bytearray(EVTX_HEADER_SIZE)
+        struct.pack_into("<8sQQQIHHHH", header, 0, b"ElfFile\0", 0, max(len(chunks) - 1, 0),
+                         self.next_record, 0x80, 1, 3, EVTX_HEADER_SIZE, len(chunks))
+        struct.pack_into("<I", header, 0x78, 0)
+        struct.pack_into("<I", header, 0x7C, zlib.crc32(bytes(header[:0x78])))
+        with open(self.path, "wb") as f:
+            f.write(header)
+            for chunk in chunks:
+                f.write(self._finish_chunk(chunk))
+
+
+def write_security_evtx(path, records=20000, logon_ratio=0.2, users=50, seed=0, start=None):
+    """
+    Security.evtx with `records` events, about `logon_ratio` of them 4624
+    logons (each followed later by a matching 4634), the rest 4672/5379 noise.
+    Returns the number of 4624 events written.
+    """
+    rng = random.Random(seed)
+    when = start or datetime(2024, 1, 1, 8, 0, 0)
+    user_names = [f"user{i:04d}@corp.example" for i in range(users)]
+    user_sids = [f"S-1-12-1-{1000000 + i}-{2000000 + i}-{3000000 + i}-{4000000 + i}" for i in range(users)]
+    computer = f"VDI-{seed:04d}.corp.example"
+    writer = EvtxWriter(path)
+    open_logons = []
+    logons = 0
+
+    for _ in range(records):
+        when += timedelta(seconds=rng.randint(1, 30))
+        roll = rng.random()
+        if roll < logon_ratio:
+            u = rng.randrange(users)
+            logon_id = f"0x{rng.getrandbits(32):x}"
+            open_logons.append((u, logon_id))
+            logons += 1
+            values = ["4624", when.isoformat() + "Z", "", computer, user_sids[u], user_names[u],
+                      "AzureAD", logon_id, rng.choice(["2", "10", "11"]), f"10.0.{u % 256}.{rng.randint(1, 254)}"]
+        elif roll < logon_ratio * 2 and open_logons:
+            u, logon_id = open_logons.pop(rng.randrange(len(open_logons)))
+            values = ["4634", when.isoformat() + "Z", "", computer, user_sids[u], user_names[u],
+                      "AzureAD", logon_id, "10", "-"]
+        else:
+            values = [rng.choice(["4672", "5379", "4798"]), when.isoformat() + "Z", "", computer,
+                      "S-1-5-18", "SYSTEM", "NT AUTHORITY", "0x3e7", "-", "-"]
+        writer.add(when, values)
+
+    writer.close()
+    return logons
+
+
+# --------------------------------------------------------------------------
+# Edge History / PECmd
+# --------------------------------------------------------------------------
+
+def write_edge_history(path, visits=50000, seed=0):
+    """Chromium `urls` table with `visits` rows"""
+    rng = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE urls(id INTEGER PRIMARY KEY AUTOINCREMENT, url LONGVARCHAR, title LONGVARCHAR,
+                    visit_count INTEGER DEFAULT 0 NOT NULL, typed_count INTEGER DEFAULT 0 NOT NULL,
+                    last_visit_time INTEGER NOT NULL, hidden INTEGER DEFAULT 0 NOT NULL)""")
+    base = 13350000000000000
+    domains = [f"site{i}.example.com" for i in range(500)]
+    conn.executemany(
+        "INSERT INTO urls(url, title, visit_count, last_visit_time) VALUES (?, ?, ?, ?)",
+        ((f"https://{rng.choice(domains)}/page/{i}?q={rng.getrandbits(32):x}", f"Page {i}",
+          rng.randint(1, 40), base + rng.randint(0, 90 * 86400) * 1000000) for i in range(visits)))
+    conn.commit()
+    conn.close()
+
+
+def write_pecmd_csv(output_dir, rows=5000, seed=0):
+    """A `*_PECmd_Output.csv` in the column layout PrefetchParser reads"""
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, "20240101000000_PECmd_Output.csv")
+    start = datetime(2024, 1, 1)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["SourceFilename", "ExecutableName", "RunCount", "LastRun", "Hash", "Size"])
+        for i in range(rows):
+            name = f"APP{i % 700:03d}.EXE"
+            last_run = start + timedelta(seconds=rng.randint(0, 90 * 86400))
+            writer.writerow([f"C:\\Windows\\Prefetch\\{name}-{rng.getrandbits(32):08X}.pf", name,
+                             rng.randint(1, 200), last_run.strftime("%Y-%m-%d %H:%M:%S"),
+                             f"{rng.getrandbits(32):08X}", rng.randint(2000, 90000)])
+    return path
+
+
+# --------------------------------------------------------------------------
+# FAT16 disk image
+# --------------------------------------------------------------------------
+
+SECTOR = 512
+
+
+def _short_name(name, used):
+    """8.3 alias; returns (11-byte name, needs_lfn)"""
+    base, dot, ext = name.rpartition('.')
+    if not dot:
+        base, ext = name, ""
+    upper_ok = name.upper() == name and ' ' not in name and name.count('.') <= 1
+    if upper_ok and 0 < len(base) <= 8 and len(ext) <= 3:
+        candidate = base.ljust(8) + ext.ljust(3)
+        if candidate not in used:
+            used.add(candidate)
+            return candidate.encode('ascii'), False
+
+    clean = lambda s: "".join(c for c in s.upper() if c.isalnum()) or "X"
+    base, ext = clean(base), clean(ext)[:3] if ext else ""
+    for n in range(1, 100000):
+        tail = f"~{n}"
+        candidate = (base[:8 - len(tail)] + tail).ljust(8) + ext.ljust(3)
+        if candidate not in used:
+            used.add(candidate)
+            return candidate.encode('ascii'), True
+    raise ValueError(f"Too many aliases for {name}")
+
+
+def _lfn_entries(name, short):
+    checksum = 0
+    for b in short:
+        checksum = (((checksum & 1) << 7) + (checksum >> 1) + b) & 0xFF
+    chars = [ord(c) for c in name] + [0]
+    chars += [0xFFFF] * ((-len(chars)) % 13)
+    parts = [chars[i:i + 13] for i in range(0, len(chars), 13)]
+    entries = []
+    for seq, part in enumerate(parts, start=1):
+        order = seq | (0x40 if seq == len(parts) else 0)
+        entries.append(struct.pack("<B10sBBB12sH4s", order,
+                                   struct.pack("<5H", *part[:5]), 0x0F, 0, checksum,
+                                   struct.pack("<6H", *part[5:11]), 0,
+                                   struct.pack("<2H", *part[11:13])))
+    return list(reversed(entries))
+
+
+class _Node:
+    __slots__ = ('name', 'children', 'size', 'content', 'cluster', 'is_dir')
+
+    def __init__(self, name, is_dir, size=0, content=None):
+        self.name = name
+        self.is_dir = is_dir
+        self.children = {} if is_dir else None
+        self.size = size
+        self.content = content
+        self.cluster = 0
+
+
+class Fat16ImageBuilder:
+    """
+    Build a raw disk image: MBR, a small unformatted recovery partition and a
+    FAT16 data partition holding the given tree. File content is either a
+    path to copy or a byte count filled with seeded pseudo-random data.
+    """
+
+    def __init__(self, size_mb=256, seed=0):
+        self.size_mb = size_mb
+        self.seed = seed
+        self.root = _Node("", True)
+
+    def add_file(self, path, size=None, source=None):
+        parts = path.strip('/').split('/')
+        node = self.root
+        for part in parts[:-1]:
+            node = node.children.setdefault(part, _Node(part, True))
+        if source is not None:
+            size = os.path.getsize(source)
+        node.children[parts[-1]] = _Node(parts[-1], False, size, source)
+
+    def _layout(self):
+        total_sectors = self.size_mb * 1024 * 1024 // SECTOR
+        self.part_start = 2048 + 4096        # after the 2 MB recovery partition
+        self.part_sectors = total_sectors - self.part_start
+        self.spc = 1
+        while self.part_sectors // self.spc > 65524:
+            self.spc *= 2
+        if self.spc > 64:
+            raise ValueError("FAT16 image larger than 2 GB; lower size_mb")
+        self.cluster_size = self.spc * SECTOR
+        self.reserved = 4
+        self.root_entries = 512
+        clusters = self.part_sectors // self.spc
+        self.fat_sectors = (clusters * 2 + SECTOR - 1) // SECTOR + 1
+        self.root_sectors = self.root_entries * 32 // SECTOR
+        self.data_start = self.reserved + 2 * self.fat_sectors + self.root_sectors
+        self.clusters = (self.part_sectors - self.data_start) // self.spc
+        if not 4085 <= self.clusters <= 65524:
+            raise ValueError(f"Cluster count {self.clusters} out of FAT16 range; adjust size_mb")
+
+    @staticmethod
+    def _entry(short, attr, cluster, size):
+        dos_date = ((2024 - 1980) << 9) | (1 << 5) | 1
+        return struct.pack("<11sBBBHHHHHHHI", short, attr, 0, 0, 0, dos_date, dos_date, 0, 0,
+                           dos_date, cluster, size)
+
+    def _dir_entries(self, node, parent_cluster, is_root):
+        entries = []
+        if not is_root:
+            entries.append(self._entry(b".          ", 0x10, node.cluster, 0))
+            entries.append(self._entry(b"..         ", 0x10, parent_cluster, 0))
+        used = set()
+        for child in node.children.values():
+            short, needs_lfn = _short_name(child.name, used)
+            if needs_lfn:
+                entries.extend(_lfn_entries(child.name, short))
+            attr = 0x10 if child.is_dir else 0x20
+            size = 0 if child.is_dir else child.size
+            entries.append(self._entry(short, attr, child.cluster, size))
+        return b"".join(entries)
+
+    def _entry_count(self, node, is_root):
+        count = 0 if is_root else 2
+        used = set()
+        for child in node.children.values():
+            short, needs_lfn = _short_name(child.name, used)
+            count += 1 + (len(_lfn_entries(child.name, short)) if needs_lfn else 0)
+        return count
+
+    def _allocate(self, node, next_cluster, chains, is_root=False):
+        for child in node.children.values():
+            if child.is_dir:
+                size = self._entry_count(child, False) * 32
+            else:
+                size = child.size
+            count = max(1, (size + self.cluster_size - 1) // self.cluster_size) if (child.is_dir or size) else 0
+            if count:
+                child.cluster = next_cluster
+                chains.append((next_cluster, count))
+                next_cluster += count
+            if child.is_dir:
+                next_cluster = self._allocate(child, next_cluster, chains)
+        if next_cluster - 2 > self.clusters:
+            raise ValueError("Tree does not fit in the image; raise size_mb")
+        return next_cluster
+
+    def _cluster_offset(self, cluster):
+        return (self.part_start + self.data_start + (cluster - 2) * self.spc) * SECTOR
+
+    def _write_tree(self, f, node, parent_cluster, rng, is_root=False):
+        for child in node.children.values():
+            if child.is_dir:
+                f.seek(self._cluster_offset(child.cluster))
+                f.write(self._dir_entries(child, 0 if is_root else node.cluster, False))
+                self._write_tree(f, child, child.cluster, rng)
+            elif child.size:
+                f.seek(self._cluster_offset(child.cluster))
+                if child.content:
+                    with open(child.content, "rb") as src:
+                        for block in iter(lambda: src.read(1024 * 1024), b""):
+                            f.write(block)
+                else:
+                    remaining = child.size
+                    while remaining:
+                        n = min(remaining, 1024 * 1024)
+                        f.write(rng.randbytes(n))
+                        remaining -= n
+
+    def build(self, path):
+        self._layout()
+        chains = []
+        self._allocate(self.root, 2, chains, is_root=True)
+
+        fat = bytearray(self.fat_sectors * SECTOR)
+        struct.pack_into("<HH", fat, 0, 0xFFF8, 0xFFFF)
+        for start, count in chains:
+            for c in range(start, start + count - 1):
+                struct.pack_into("<H", fat, c * 2, c + 1)
+            struct.pack_into("<H", fat, (start + count - 1) * 2, 0xFFFF)
+
+        boot = bytearray(SECTOR)
+        total = self.part_sectors
+        boot[0:3] = b"\xEB\x3C\x90"
+        struct.pack_into("<8sHBHBHHBHHHII", boot, 3, b"MSDOS5.0", SECTOR, self.spc, self.reserved, 2,
+                         self.root_entries, total if total < 65536 else 0, 0xF8, self.fat_sectors,
+                         63, 255, self.part_start, total if total >= 65536 else 0)
+        struct.pack_into("<BBBI11s8s", boot, 36, 0x80, 0, 0x29, self.seed & 0xFFFFFFFF,
+                         b"SYNTHETIC  ", b"FAT16   ")
+        boot[510:512] = b"\x55\xAA"
+
+        mbr = bytearray(SECTOR)
+        # Partition 1: 2 MB recovery area (type 0x27, no filesystem); partition 2: FAT16
+        struct.pack_into("<B3sB3sII", mbr, 446, 0x00, b"\xFE\xFF\xFF", 0x27, b"\xFE\xFF\xFF", 2048, 4096)
+        struct.pack_into("<B3sB3sII", mbr, 462, 0x80, b"\xFE\xFF\xFF", 0x0E, b"\xFE\xFF\xFF",
+                         self.part_start, self.part_sectors)
+        mbr[510:512] = b"\x55\xAA"
+
+        rng = random.Random(self.seed)
+        with open(path, "wb") as f:
+            f.truncate(self.size_mb * 1024 * 1024)
+            f.write(mbr)
+            base = self.part_start * SECTOR
+            f.seek(base)
+            f.write(boot)
+            for i in range(2):
+                f.seek(base + (self.reserved + i * self.fat_sectors) * SECTOR)
+                f.write(fat)
+            f.seek(base + (self.reserved + 2 * self.fat_sectors) * SECTOR)
+            f.write(self._dir_entries(self.root, 0, True))
+            self._write_tree(f, self.root, 0, rng, is_root=True)
+        return path
+
+
+def wrap_fixed_vhd(raw_path, vhd_path, seed=0):
+    """Append a fixed-disk VHD footer to a copy of a raw image; its timestamp and UUID come from seed"""
+    size = os.path.getsize(raw_path)
+    with open(raw_path, "rb") as src, open(vhd_path, "wb") as dst:
+        for block in iter(lambda: src.read(4 * 1024 * 1024), b""):
+            dst.write(block)
+
+        # CHS geometry as specified in the VHD format document
+        sectors = min(size // SECTOR, 65535 * 16 * 255)
+        if sectors >= 65535 * 16 * 63:
+            spt, heads = 255, 16
+        else:
+            spt = 17
+            heads = max(4, (sectors // spt + 1023) // 1024)
+            if sectors // spt >= heads * 1024 or heads > 16:
+                spt, heads = 31, 16
+            if sectors // spt >= heads * 1024:
+                spt, heads = 63, 16
+        cylinders = sectors // spt // heads
+
+        # Seconds since 2000-01-01 UTC, the VHD epoch
+        created = int((datetime(2024, 1, 1) - datetime(2000, 1, 1)).total_seconds()) + seed
+        disk_id = uuid.UUID(int=random.Random(seed).getrandbits(128))
+
+        footer = bytearray(SECTOR)
+        struct.pack_into(">8sIIQI4sI4sQQHBBII16sB", footer, 0,
+                         b"conectix", 2, 0x00010000, 0xFFFFFFFFFFFFFFFF,
+                         created, b"bnch", 0x00010000, b"Wi2k",
+                         size, size, min(cylinders, 65535), heads, spt, 2, 0,
+                         disk_id.bytes, 0)
+        checksum = (~sum(footer)) & 0xFFFFFFFF
+        struct.pack_into(">I", footer, 64, checksum)
+        dst.write(footer)
+    return vhd_path
+
+
+# --------------------------------------------------------------------------
+# Corpus
+# --------------------------------------------------------------------------
+
+SCALES = {
+    # image MB, users, prefetch files, filler files per user, evtx records, 4624 ratio, history visits, pecmd rows
+    'small': dict(image_mb=128, users=4, prefetch=120, filler=40, evtx_records=20000,
+                  logon_ratio=0.2, visits=20000, pecmd_rows=5000),
+    'medium': dict(image_mb=512, users=12, prefetch=250, filler=120, evtx_records=150000,
+                   logon_ratio=0.2, visits=200000, pecmd_rows=50000),
+    'large': dict(image_mb=1536, users=40, prefetch=500, filler=200, evtx_records=600000,
+                  logon_ratio=0.2, visits=1000000, pecmd_rows=200000),
+}
+
+
+def build_corpus(workdir, scale='small', seed=0, **overrides):
+    """
+    Generate (or reuse) the benchmark corpus under workdir/corpus-<scale>-<seed>.
+    Returns a dict of paths and the parameters used.
+    """
+    params = dict(SCALES[scale], **overrides)
+    tag = f"{scale}-{seed}" + "".join(f"-{k}{v}" for k, v in sorted(overrides.items()))
+    corpus_dir = os.path.join(workdir, f"corpus-{tag}")
+    manifest = os.path.join(corpus_dir, "corpus.done")
+    paths = {
+        'dir': corpus_dir,
+        'raw': os.path.join(corpus_dir, "synthetic.img"),
+        'vhd': os.path.join(corpus_dir, "synthetic.vhd"),
+        'evtx': os.path.join(corpus_dir, "Security.evtx"),
+        'history': os.path.join(corpus_dir, "History"),
+        'pecmd_dir': os.path.join(corpus_dir, "pecmd"),
+        'params': params,
+    }
+    if os.path.exists(manifest):
+        return paths
+
+    os.makedirs(corpus_dir, exist_ok=True)
+    rng = random.Random(seed)
+    write_security_evtx(paths['evtx'], params['evtx_records'], params['logon_ratio'],
+                        users=max(params['users'] * 5, 10), seed=seed)
+    write_edge_history(paths['history'], params['visits'], seed=seed)
+    write_pecmd_csv(paths['pecmd_dir'], params['pecmd_rows'], seed=seed)
+
+    builder = Fat16ImageBuilder(params['image_mb'], seed=seed)
+    builder.add_file("Windows/System32/config/SOFTWARE", size=24 * 1024 * 1024)
+    builder.add_file("Windows/System32/config/SAM", size=64 * 1024)
+    builder.add_file("Windows/System32/config/SYSTEM", size=8 * 1024 * 1024)
+    builder.add_file("Windows/System32/winevt/Logs/Security.evtx", source=paths['evtx'])
+    for log in ["Application.evtx", "System.evtx", "Setup.evtx"]:
+        builder.add_file(f"Windows/System32/winevt/Logs/{log}", size=1024 * 1024)
+    for i in range(params['prefetch']):
+        builder.add_file(f"Windows/Prefetch/APP{i:03d}.EXE-{rng.getrandbits(32):08X}.pf",
+                         size=rng.randint(4, 60) * 1024)
+    for u in range(params['users']):
+        home = f"Users/user{u:02d}"
+        builder.add_file(f"{home}/NTUSER.DAT", size=1024 * 1024)
+        builder.add_file(f"{home}/AppData/Local/Microsoft/Edge/User Data/Default/History",
+                         source=paths['history'])
+        for k in range(params['filler']):
+            builder.add_file(f"{home}/Documents/Report {k:03d}.docx", size=rng.randint(8, 400) * 1024)
+    builder.add_file("Program Files/Common Files/placeholder.dll", size=2 * 1024 * 1024)
+    builder.build(paths['raw'])
+    wrap_fixed_vhd(paths['raw'], paths['vhd'], seed=seed)
+
+    with open(manifest, "w") as f:
+        f.write(repr(params))
+    return paths
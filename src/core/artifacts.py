@@ -0,0 +1,63 @@
+import re
+
+# Artifact type -> path of the file inside the image ('*' matches one path component)
+ARTIFACT_PATHS = {
+    'prefetch': '/Windows/Prefetch/*',
+    'edge_history': '/Users/*/AppData/Local/Microsoft/Edge/User Data/Default/History',
+    'security_evtx': '/Windows/System32/winevt/Logs/Security.evtx',
+    'lsm_evtx': '/Windows/System32/winevt/Logs/Microsoft-Windows-TerminalServices-LocalSessionManager%4Operational.evtx',
+    'software_hive': '/Windows/System32/config/SOFTWARE',
+    'sam_hive': '/Windows/System32/config/SAM',
+    'ntuser': '/Users/*/NTUSER.DAT',
+}
+
+# Extraction targets that cover every artifact above
+EXTRACT_TARGETS = [
+    'Windows/Prefetch',
+    'Users/*/AppData/Local/Microsoft/Edge/User Data/Default/History',
+    'Windows/System32/winevt/Logs/Security.evtx',
+    'Windows/System32/winevt/Logs/Microsoft-Windows-TerminalServices-LocalSessionManager%4Operational.evtx',
+    'Windows/System32/config/SOFTWARE',
+    'Windows/System32/config/SAM',
+    'Users/*/NTUSER.DAT',
+]
+
+_USER_RE = re.compile(r"^/Users/([^/]+)/", re.IGNORECASE)
+
+
+def _compile(pattern, separator):
+    parts = [re.escape(part) for part in pattern.split('*')]
+    component = '([^/]+)' if separator == '/' else '(.+)'
+    return re.compile(component.join(parts), re.IGNORECASE)
+
+
+_SOURCE_RES = {name: _compile(path, '/') for name, path in ARTIFACT_PATHS.items()}
+# Folder/file names _save_entry produced before the manifest existed ('/' in the folder part became '_')
+_LEGACY_RES = {
+    name: (_compile(path.rsplit('/', 1)[0].strip('/').replace('/', '_'), '_'), _compile(path.rsplit('/', 1)[1], '_'))
+    for name, path in ARTIFACT_PATHS.items()
+}
+
+
+def classify(source_path):
+    """(artifact type, user folder) for a path inside the image; either may be None"""
+    source_path = '/' + source_path.replace('\\', '/').lstrip('/')
+    artifact = None
+    for name, regex in _SOURCE_RES.items():
+        if regex.fullmatch(source_path):
+            artifact = name
+            break
+    user = _USER_RE.match(source_path)
+    return artifact, user.group(1) if user else None
+
+
+def legacy_source_path(rel_dir, file_name):
+    """Best-effort original path for a file extracted into <rel_dir>/<file_name> by the old layout"""
+    for name, (dir_re, file_re) in _LEGACY_RES.items():
+        dir_match = dir_re.fullmatch(rel_dir)
+        file_match = file_re.fullmatch(file_name)
+        if not dir_match or not file_match:
+            continue
+        values = iter(dir_match.groups() + file_match.groups())
+        return re.sub(r"\*", lambda _: next(values), ARTIFACT_PATHS[name])
+    return None
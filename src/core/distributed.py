@@ -0,0 +1,383 @@
+"""
+Coordinator/worker mode for analysing many images on several processes or hosts.
+
+    # on the coordinator (here with three local workers)
+    python -m src.core.distributed coordinator --queue-dir /share/queue --workspace /share/workspace \\
+        --local-workers 3 --images /share/images/*.E01
+
+    # on every other analysis host
+    python -m src.core.distributed worker --queue-dir /share/queue --workspace /share/workspace
+
+Image paths, the queue directory and the workspace must be reachable under
+the same paths from every node. The queue directory only needs atomic
+rename, so a network share works for it. The workspace is different: every
+image workspace holds a SQLite manifest.db, and SQLite locking is not safe
+over SMB/NFS. Keep the workspace on a local disk (local workers only) or on
+a cluster filesystem with working POSIX locks. Do not put it on a plain
+network share.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import argparse
+import threading
+import multiprocessing
+
+from src.core.vhd_manager import EvidenceManager
+from src.core.job_queue import JobQueue, PermanentError, DONE, DEAD, image_identity
+from src.core.artifacts import EXTRACT_TARGETS
+from src.core.pipeline import PARSE_STAGES, STAGE_HANDLERS, scheduled_stages
+from src.core.exporter import ChunkedExporter, EXPORT_FIELDS, available_formats
+from src.core.metrics import metrics, setup_logging
+
+logger = logging.getLogger("ForensicAnalyzer")
+
+DEFAULT_ARTIFACTS = EXTRACT_TARGETS
+
+
+class LeaseQueue:
+    """
+    Task transport over a shared directory.
+
+    A task is a JSON file. Workers claim it by renaming it from pending/ to
+    running/ (rename is atomic, so exactly one worker wins) and keep the
+    lease alive by touching the file. A finished task's result is written to
+    results/ and the lease file removed. Leases whose file has not been
+    touched for lease_timeout seconds belong to a dead worker and are
+    reclaimed by the coordinator.
+
+    Worker and coordinator clocks may disagree, so the mtime is never compared
+    with the coordinator's time; the coordinator only notes when it last saw a
+    lease's mtime change and measures the timeout on its own clock from there.
+    """
+
+    def __init__(self, root, lease_timeout=120):
+        self.root = root
+        self.lease_timeout = lease_timeout
+        self.pending_dir = os.path.join(root, "pending")
+        self.running_dir = os.path.join(root, "running")
+        self.results_dir = os.path.join(root, "results")
+        self.tmp_dir = os.path.join(root, "tmp")
+        # Lease name -> (last mtime seen, local monotonic time it was first seen)
+        self._seen = {}
+        for path in (self.pending_dir, self.running_dir, self.results_dir, self.tmp_dir):
+            os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def _name(task_id):
+        return f"{task_id:010d}.json"
+
+    def _write(self, directory, name, data):
+        temp_path = os.path.join(self.tmp_dir, f"{name}.{socket.gethostname()}.{os.getpid()}")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, os.path.join(directory, name))
+
+    def publish(self, task):
+        name = self._name(task['id'])
+        if os.path.exists(os.path.join(self.pending_dir, name)) or os.path.exists(os.path.join(self.running_dir, name)):
+            return False
+        self._write(self.pending_dir, name, task)
+        return True
+
+    def claim(self):
+        for name in sorted(os.listdir(self.pending_dir)):
+            lease_path = os.path.join(self.running_dir, name)
+            try:
+                os.rename(os.path.join(self.pending_dir, name), lease_path)
+            except OSError:
+                continue  # another worker got it first
+            os.utime(lease_path)
+            with open(lease_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return None
+
+    def heartbeat(self, task):
+        try:
+            os.utime(os.path.join(self.running_dir, self._name(task['id'])))
+        except FileNotFoundError:
+            pass
+
+    def finish(self, task, result):
+        name = self._name(task['id'])
+        self._write(self.results_dir, name, result)
+        try:
+            os.remove(os.path.join(self.running_dir, name))
+        except FileNotFoundError:
+            pass
+
+    def collect(self):
+        """Yield and consume the results reported so far"""
+        for name in sorted(os.listdir(self.results_dir)):
+            path = os.path.join(self.results_dir, name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    result = json.load(f)
+                os.remove(path)
+            except (OSError, ValueError):
+                continue
+            yield result
+
+    def expire(self):
+        """Remove leases that stopped heartbeating and return their tasks"""
+        expired = []
+        now = time.monotonic()
+        names = os.listdir(self.running_dir)
+        for name in names:
+            path = os.path.join(self.running_dir, name)
+            try:
+                mtime = os.path.getmtime(path)
+                last_mtime, since = self._seen.get(name, (None, now))
+                if mtime != last_mtime:
+                    self._seen[name] = (mtime, now)
+                    continue
+                if now - since < self.lease_timeout:
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    task = json.load(f)
+                os.remove(path)
+            except (OSError, ValueError):
+                continue
+            self._seen.pop(name, None)
+            expired.append(task)
+        for name in set(self._seen) - set(names):
+            del self._seen[name]
+        return expired
+
+    def stop(self):
+        open(os.path.join(self.root, "STOP"), 'w').close()
+
+    def stopped(self):
+        return os.path.exists(os.path.join(self.root, "STOP"))
+
+    def reset_stop(self):
+        try:
+            os.remove(os.path.join(self.root, "STOP"))
+        except FileNotFoundError:
+            pass
+
+
+class Worker:
+    """Pull tasks from a LeaseQueue until the coordinator signals STOP"""
+
+    def __init__(self, queue_dir, workspace="workspace", fmt="csv", lease_timeout=120, poll_interval=1.0):
+        self.leases = LeaseQueue(queue_dir, lease_timeout)
+        self.workspace = workspace
+        self.fmt = fmt
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._manager = None
+
+    def _evidence(self, image):
+        # Consecutive extract tasks are usually for the same image; keep its handle open
+        if self._manager is None or self._manager.image_path != os.path.abspath(image):
+            self._release()
+            self._manager = EvidenceManager(image, workspace_base=self.workspace)
+        return self._manager
+
+    def _release(self):
+        """Close the cached image (handles, read-ahead thread and its memory reservation)"""
+        if self._manager is not None:
+            manager, self._manager = self._manager, None
+            manager.close()
+
+    def _execute(self, task):
+        if task['stage'] == 'extract':
+            manager = self._evidence(task['image'])
+            if manager.fs_info is None:
+                self._release()
+                raise PermanentError("No filesystem loaded")
+            return manager.extract_single_target(task['artifact'])
+        return STAGE_HANDLERS[task['stage']](task['image'], self.workspace, self.fmt)
+
+    def _keep_alive(self, task, done):
+        while not done.wait(self.leases.lease_timeout / 3):
+            self.leases.heartbeat(task)
+
+    def run(self):
+        logger.info(f"Worker {self.worker_id} started")
+        processed = 0
+        while True:
+            task = self.leases.claim()
+            if task is None:
+                if self.leases.stopped():
+                    break
+                time.sleep(self.poll_interval)
+                continue
+
+            done = threading.Event()
+            threading.Thread(target=self._keep_alive, args=(task, done), daemon=True).start()
+            started = time.perf_counter()
+            try:
+                with metrics.stage(task['stage']):
+                    result = {'ok': True, 'data': self._execute(task)}
+            except Exception as e:
+                result = {'ok': False, 'error': f"{type(e).__name__}: {e}", 'permanent': isinstance(e, PermanentError)}
+            finally:
+                done.set()
+            result.update(task=task, worker=self.worker_id, elapsed_s=time.perf_counter() - started)
+            self.leases.finish(task, result)
+            processed += 1
+
+        self._release()
+        logger.info(f"Worker {self.worker_id} stopped after {processed} tasks")
+        metrics.log_summary()
+        return processed
+
+
+def run_worker(queue_dir, workspace, fmt="csv", lease_timeout=120, log_level=None):
+    setup_logging(log_level)
+    return Worker(queue_dir, workspace, fmt, lease_timeout).run()
+
+
+class Coordinator:
+    """
+    Owns the case store (the JobQueue in the workspace) and feeds the shared
+    LeaseQueue from it. Extract tasks are queued per (image, artifact); once
+    every extract task of an image has finished, its parse stages are queued.
+    Failed or abandoned tasks are retried with the JobQueue's backoff.
+    """
+
+    def __init__(self, queue_dir, images, artifacts=None, workspace="workspace", fmt="csv",
+                 stages=None, lease_timeout=120, poll_interval=1.0):
+        self.leases = LeaseQueue(queue_dir, lease_timeout)
+        self.images = [os.path.abspath(image) for image in images]
+        self.identities = {image: image_identity(image) for image in self.images}
+        self.artifacts = list(artifacts or DEFAULT_ARTIFACTS)
+        self.workspace = workspace
+        self.fmt = fmt
+        # A stage that writes another's output too (sid_map also builds the sessions) replaces it
+        self.stages = scheduled_stages(list(PARSE_STAGES if stages is None else stages))
+        self.poll_interval = poll_interval
+        self.jobs = JobQueue(os.path.join(workspace, "jobs.db"))
+
+    def _publish_due(self):
+        published = 0
+        claims = [('extract', self.artifacts)] + [(stage, [""]) for stage in self.stages]
+        for stage, artifacts in claims:
+            while True:
+                task = self.jobs.claim(stage, self.images, artifacts)
+                if task is None:
+                    break
+                self.leases.publish({key: task[key] for key in ('id', 'image', 'artifact', 'stage', 'attempts')})
+                published += 1
+        return published
+
+    def _queue_parse_stages(self, image):
+        counts = self.jobs.counts('extract', [image], self.artifacts)
+        if set(counts) <= {DONE, DEAD}:
+            for stage in self.stages:
+                self.jobs.add(image, "", stage, image_id=self.identities[image])
+
+    def _handle_result(self, result):
+        task = self.jobs.get(result['task']['image'], result['task']['artifact'], result['task']['stage'])
+        if task is None or task['status'] == DONE:
+            return  # a late duplicate from a lease that was already reclaimed
+        if result['ok']:
+            self.jobs.complete(task, result['data'])
+            logger.info(f"{result['worker']}: {task['stage']} {os.path.basename(task['image'])} "
+                        f"{task['artifact']} done in {result['elapsed_s']:.1f}s")
+        else:
+            self.jobs.fail(task, result['error'], permanent=result.get('permanent', False))
+        if task['stage'] == 'extract':
+            self._queue_parse_stages(task['image'])
+
+    def _outstanding(self):
+        counts = {}
+        for stage, artifacts in [('extract', self.artifacts)] + [(stage, [""]) for stage in self.stages]:
+            for status, n in self.jobs.counts(stage, self.images, artifacts).items():
+                counts[status] = counts.get(status, 0) + n
+        return sum(n for status, n in counts.items() if status not in (DONE, DEAD)), counts
+
+    def run(self):
+        self.leases.reset_stop()
+        self.jobs.recover()
+        self.jobs.reset(images=self.images)
+        for image in self.images:
+            for artifact in self.artifacts:
+                self.jobs.add(image, artifact, "extract", image_id=self.identities[image])
+            self._queue_parse_stages(image)
+
+        while True:
+            self._publish_due()
+            for result in self.leases.collect():
+                self._handle_result(result)
+            for task in self.leases.expire():
+                current = self.jobs.get(task['image'], task['artifact'], task['stage'])
+                if current is not None and current['status'] != DONE:
+                    self.jobs.fail(current, "lease expired (worker lost)")
+
+            outstanding, counts = self._outstanding()
+            if not outstanding:
+                break
+            time.sleep(self.poll_interval)
+
+        self.leases.stop()
+        logger.info(f"All tasks finished: {counts}")
+        self._export_status()
+        self.jobs.close()
+        return counts
+
+    def _export_status(self):
+        status_path = os.path.join(self.workspace, f"extraction_status.{self.fmt}")
+        with ChunkedExporter(status_path, EXPORT_FIELDS['extraction'], fmt=self.fmt) as status_log:
+            for task in self.jobs.tasks('extract', self.images, self.artifacts):
+                source = os.path.basename(task['image'])
+                stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(task['updated']))
+                if task['status'] != DONE:
+                    status_log.write({'timestamp': stamp, 'artifact': task['artifact'], 'status': "Failed",
+                                      'message': task['last_error'], 'source': source})
+                    continue
+                for res in self.jobs.result(task):
+                    status_log.write({'timestamp': stamp, 'artifact': res['path'],
+                                      'status': "Success" if res['success'] else "Failed",
+                                      'message': res['message'], 'source': source})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed evidence extraction and parsing")
+    sub = parser.add_subparsers(dest="role", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--queue-dir", required=True, help="shared directory used as the task queue")
+    common.add_argument("--workspace", default="workspace", help="shared case workspace")
+    common.add_argument("--format", default="csv", choices=available_formats())
+    common.add_argument("--lease-timeout", type=float, default=120)
+    common.add_argument("--log-level", default=None)
+
+    coordinator = sub.add_parser("coordinator", parents=[common])
+    # A named option, so the list-valued options around it cannot swallow image paths
+    coordinator.add_argument("--images", nargs="+", required=True)
+    coordinator.add_argument("--artifacts", nargs="+", default=DEFAULT_ARTIFACTS)
+    coordinator.add_argument("--stages", nargs="*", default=PARSE_STAGES, choices=PARSE_STAGES)
+    coordinator.add_argument("--local-workers", type=int, default=0, help="also start N workers on this host")
+
+    sub.add_parser("worker", parents=[common])
+    args = parser.parse_args(argv)
+    setup_logging(args.log_level)
+
+    if args.role == "worker":
+        run_worker(args.queue_dir, args.workspace, args.format, args.lease_timeout, args.log_level)
+        return 0
+
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=run_worker,
+                           args=(args.queue_dir, args.workspace, args.format, args.lease_timeout, args.log_level))
+               for _ in range(args.local_workers)]
+    coord = Coordinator(args.queue_dir, args.images, args.artifacts, args.workspace, args.format,
+                        args.stages, args.lease_timeout)
+    # Clear a STOP left by an earlier run before local workers look for it
+    coord.leases.reset_stop()
+    for proc in workers:
+        proc.start()
+    counts = coord.run()
+    for proc in workers:
+        proc.join()
+    return 0 if not counts.get(DEAD) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
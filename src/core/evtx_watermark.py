@@ -0,0 +1,146 @@
+import os
+import json
+import zlib
+import logging
+
+logger = logging.getLogger("ForensicAnalyzer")
+
+
+class WatermarkStore:
+    """
+    Per VM and log, the last EVTX record processed and where it was found.
+
+    A watermark is a dict with:
+      record_id         - highest record number already merged
+      chunk_offset      - file offset of the chunk holding that record
+      chunk_first_record - first record number of that chunk when it was read
+      record_crc        - CRC32 of that record's raw bytes, to recognise it again
+      size, next_record - file size and next record number from the file header
+    """
+
+    def __init__(self, store_path=os.path.join("workspace", "evtx_watermarks.json")):
+        self.store_path = store_path
+        self._marks = {}
+        if os.path.exists(store_path):
+            try:
+                with open(store_path, 'r', encoding='utf-8') as f:
+                    self._marks = json.load(f)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable watermark store {store_path}: {e}")
+
+    @staticmethod
+    def _key(vhd_id, log_name):
+        return f"{vhd_id}/{log_name}"
+
+    def get(self, vhd_id, log_name):
+        return self._marks.get(self._key(vhd_id, log_name))
+
+    def set(self, vhd_id, log_name, mark):
+        self._marks[self._key(vhd_id, log_name)] = mark
+
+    def clear(self):
+        self._marks = {}
+
+    def save(self):
+        try:
+            store_dir = os.path.dirname(self.store_path)
+            if store_dir:
+                os.makedirs(store_dir, exist_ok=True)
+            temp_path = self.store_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._marks, f, indent=1)
+            os.replace(temp_path, self.store_path)
+        except Exception as e:
+            logger.error(f"Watermark save failed: {e}")
+
+
+class IncrementalReader:
+    """
+    Iterate only the records of an open Evtx log that are newer than a watermark.
+
+    Chunk headers carry their first/last record numbers, so chunks that are
+    entirely below the watermark are skipped without parsing a single record.
+    Before resuming, the watermark record itself is looked up and its CRC
+    compared; if it is gone or different, the log was cleared or replaced
+    (even with the same size and chunk layout) and the whole file is read again.
+    """
+
+    def __init__(self, log, file_size, mark=None):
+        self.log = log
+        self.mark = mark
+        self.skipped_chunks = 0
+        self.new_records = 0
+        self._size = file_size
+        self._next_record = log.get_file_header().next_record_number()
+        self._since = self._resume_point()
+        self._last = None
+
+    def _resume_point(self):
+        mark = self.mark
+        if not mark:
+            return 0
+        if self._next_record <= mark['record_id']:
+            logger.info("EVTX record numbers went backwards, re-reading the whole log")
+            return 0
+        if not self._watermark_record_matches(mark):
+            logger.info("EVTX watermark record is gone or changed (log cleared or replaced), re-reading the whole log")
+            return 0
+        return mark['record_id']
+
+    def _watermark_record_matches(self, mark):
+        if 'record_crc' not in mark:
+            # Watermarks stored before records were fingerprinted cannot be verified
+            return False
+        for chunk in self.log.chunks():
+            if chunk.offset() != mark['chunk_offset']:
+                continue
+            if chunk.log_first_record_number() != mark['chunk_first_record']:
+                return False
+            for record in chunk.records():
+                if record.record_num() == mark['record_id']:
+                    return zlib.crc32(record.data()) == mark['record_crc']
+            return False
+        # Watermark chunk no longer exists (file truncated or replaced)
+        return False
+
+    def records(self):
+        """The records past the watermark; chunks entirely below it are not parsed"""
+        for record, new in self._iter(skip_old=True):
+            if new:
+                yield record
+
+    def all_records(self):
+        """(record, is_new) for every record, for callers that need the old records too"""
+        return self._iter(skip_old=False)
+
+    def _iter(self, skip_old):
+        for chunk in self.log.chunks():
+            if skip_old and chunk.log_last_record_number() <= self._since:
+                self.skipped_chunks += 1
+                continue
+            for record in chunk.records():
+                record_id = record.record_num()
+                if record_id <= self._since:
+                    if not skip_old:
+                        yield record, False
+                    continue
+                self.new_records += 1
+                if self._last is None or record_id > self._last[0]:
+                    self._last = (record_id, chunk.offset(), chunk.log_first_record_number(), record)
+                yield record, True
+
+    def watermark(self):
+        """The watermark to store once records() has been consumed"""
+        if self._last is None:
+            if self.mark and self._since:
+                return dict(self.mark, size=self._size, next_record=self._next_record)
+            return None
+        record_id, chunk_offset, chunk_first_record, record = self._last
+        return {
+            'record_id': record_id,
+            'chunk_offset': chunk_offset,
+            'chunk_first_record': chunk_first_record,
+            'record_crc': zlib.crc32(record.data()),
+            'size': self._size,
+            'next_record': self._next_record,
+        }
@@ -0,0 +1,158 @@
+import os
+import re
+import csv
+import json
+import logging
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from src.core.records import LogonSession
+from src.core.metrics import metrics
+
+logger = logging.getLogger("ForensicAnalyzer")
+
+EXPORT_FORMATS = ['csv', 'jsonl', 'parquet']
+
+
+def available_formats():
+    """Export formats usable in this environment (Parquet needs pyarrow)"""
+    return [fmt for fmt in EXPORT_FORMATS if fmt != 'parquet' or pa is not None]
+
+
+def safe_filename(name):
+    """A user-supplied name reduced to characters that are safe in a file name"""
+    return re.sub(r"[^\w.-]", "_", name).lstrip('.') or "_"
+
+# Column layout per artifact type
+EXPORT_FIELDS = {
+    'mapping': ['time', 'user', 'sid', 'folder_name', 'domain', 'logon_type', 'vhd'],
+    'prefetch': ['timestamp', 'name', 'count', 'source'],
+    'edge': ['time', 'folder_name', 'title', 'url', 'count', 'source'],
+    'extraction': ['timestamp', 'artifact', 'status', 'message', 'source'],
+    'sessions': list(LogonSession.__slots__),
+}
+
+
+def _value(row, field):
+    if isinstance(row, dict):
+        return row.get(field)
+    return getattr(row, field, None)
+
+
+class ChunkedExporter:
+    """
+    Write rows to CSV, JSONL or Parquet as they arrive.
+
+    At most chunk_size rows are buffered before they are flushed to disk, so
+    exporting a generator never holds more than one chunk in memory.
+    """
+
+    def __init__(self, output_path, fields, fmt=None, chunk_size=5000):
+        self.output_path = output_path
+        self.fields = list(fields)
+        self.fmt = (fmt or os.path.splitext(output_path)[1].lstrip('.')).lower()
+        self.chunk_size = chunk_size
+        self.rows_written = 0
+        self._buffer = []
+        self._file = None
+        self._writer = None
+
+        if self.fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {self.fmt}")
+        if self.fmt == 'parquet' and pa is None:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+
+        out_dir = os.path.dirname(output_path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        self._open()
+
+    def _open(self):
+        if self.fmt == 'csv':
+            self._file = open(self.output_path, 'w', newline='', encoding='utf-8-sig')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.fields)
+        elif self.fmt == 'jsonl':
+            self._file = open(self.output_path, 'w', encoding='utf-8')
+        else:
+            schema = pa.schema([(name, pa.string()) for name in self.fields])
+            self._writer = pq.ParquetWriter(self.output_path, schema)
+
+    def write(self, row):
+        self._buffer.append(row)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+        return self.rows_written + len(self._buffer)
+
+    def flush(self):
+        if not self._buffer:
+            return
+
+        if self.fmt == 'csv':
+            self._writer.writerows([[_value(row, f) for f in self.fields] for row in self._buffer])
+        elif self.fmt == 'jsonl':
+            self._file.writelines(
+                json.dumps({f: _value(row, f) for f in self.fields}, ensure_ascii=False, default=str) + '\n'
+                for row in self._buffer)
+        else:
+            columns = []
+            for f in self.fields:
+                values = [_value(row, f) for row in self._buffer]
+                columns.append(pa.array([None if v is None else str(v) for v in values], type=pa.string()))
+            self._writer.write_table(pa.Table.from_arrays(columns, names=self.fields))
+
+        self.rows_written += len(self._buffer)
+        metrics.incr('rows_exported', len(self._buffer))
+        self._buffer = []
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self.fmt == 'parquet':
+                self._writer.close()
+            else:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_rows(path, fmt=None):
+    """Stream back the rows of a file written by ChunkedExporter, as dicts of strings"""
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+    if fmt == 'csv':
+        with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+            yield from csv.DictReader(f)
+    elif fmt == 'jsonl':
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif fmt == 'parquet':
+        if pq is None:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def export_rows(rows, output_path, artifact, fmt=None, chunk_size=5000):
+    """Export an iterable of rows (dicts or record objects) for the given artifact type"""
+    with ChunkedExporter(output_path, EXPORT_FIELDS[artifact], fmt=fmt, chunk_size=chunk_size) as exporter:
+        exporter.write_rows(rows)
+    logger.info(f"Exported {exporter.rows_written} {artifact} rows to {output_path}")
+    return exporter.rows_written
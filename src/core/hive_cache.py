@@ -0,0 +1,77 @@
+import os
+import json
+import hashlib
+import logging
+
+from src.core.metrics import metrics
+
+logger = logging.getLogger("ForensicAnalyzer")
+
+
+class HiveCache:
+    """
+    Persistent cache of registry hive extraction results, keyed by the SHA-256
+    of the hive content, the kind of extraction (ProfileList, SAM names,
+    NTUSER accounts) and the parser version. Cloned VMs that share a
+    byte-identical hive are parsed once, and re-runs only parse hives whose
+    content (or parser) changed.
+    """
+
+    def __init__(self, cache_path=os.path.join("workspace", "hive_cache.json")):
+        self.cache_path = cache_path
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable hive cache {self.cache_path}: {e}")
+            self._entries = {}
+
+    @staticmethod
+    def file_hash(path, block_size=1024 * 1024):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get_or_parse(self, hive_path, kind, parse_fn, version=0):
+        """Return the cached result for this hive content and parser version, or run parse_fn(hive_path) and store it"""
+        key = f"{kind}:v{version}:{self.file_hash(hive_path)}"
+        if key in self._entries:
+            self.hits += 1
+            metrics.incr('hive_cache_hits')
+            return self._entries[key]
+
+        self.misses += 1
+        metrics.incr('hive_cache_misses')
+        result = parse_fn(hive_path)
+        self._entries[key] = result
+        self._dirty = True
+        return result
+
+    def save(self):
+        if not self._dirty:
+            return
+        try:
+            cache_dir = os.path.dirname(self.cache_path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            temp_path = self.cache_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(temp_path, self.cache_path)
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"Hive cache save failed: {e}")
+
+    def __len__(self):
+        return len(self._entries)
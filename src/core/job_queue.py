@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+
+logger = logging.getLogger("ForensicAnalyzer")
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+DEAD = "dead"
+
+
+class PermanentError(RuntimeError):
+    """A task failure that retrying cannot fix (e.g. an image without a readable filesystem)"""
+
+
+def image_identity(path):
+    """Size and modification time of an image file; changes when the evidence at path is replaced"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class JobQueue:
+    """
+    Durable task queue in a local SQLite file, one row per (image, artifact, stage).
+
+    Every state change is committed immediately, so after a crash or an
+    accidental close a new run skips tasks that are done, puts tasks that
+    were running back to pending, and retries failed tasks once their
+    exponential backoff has elapsed. Tasks that keep failing are parked as
+    dead after max_attempts, permanent failures right away.
+
+    Tasks remember the identity of the image they were queued for; queueing
+    them again for a different image at the same path (re-collected
+    evidence) starts them over instead of replaying the old result.
+    """
+
+    def __init__(self, db_path=os.path.join("workspace", "jobs.db"), max_attempts=3,
+                 backoff_base=30.0, backoff_max=900.0):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                image TEXT NOT NULL,
+                artifact TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                result TEXT,
+                updated REAL,
+                image_id TEXT,
+                UNIQUE (image, artifact, stage)
+            )""")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(tasks)")]
+        if 'image_id' not in columns:
+            # Queues written before image identities were tracked; their tasks start over once
+            self.conn.execute("ALTER TABLE tasks ADD COLUMN image_id TEXT")
+
+    def add(self, image, artifact, stage="extract", image_id=None):
+        """Queue a task unless it already exists for the same image_id; a different image_id starts it over"""
+        now = time.time()
+        self.conn.execute("INSERT OR IGNORE INTO tasks (image, artifact, stage, updated, image_id) VALUES (?, ?, ?, ?, ?)",
+                          (image, artifact, stage, now, image_id))
+        if image_id is None:
+            return
+        cursor = self.conn.execute(
+            "UPDATE tasks SET status = ?, attempts = 0, next_attempt = 0, last_error = NULL, result = NULL, "
+            "updated = ?, image_id = ? WHERE image = ? AND artifact = ? AND stage = ? AND image_id IS NOT ?",
+            (PENDING, now, image_id, image, artifact, stage, image_id))
+        if cursor.rowcount:
+            logger.info(f"Job queue: {image} changed since the last run; {artifact or stage} queued again")
+
+    def recover(self):
+        """Return tasks left running by a run that died to pending; returns how many"""
+        cursor = self.conn.execute("UPDATE tasks SET status = ?, updated = ? WHERE status = ?",
+                                   (PENDING, time.time(), RUNNING))
+        if cursor.rowcount:
+            logger.info(f"Job queue: {cursor.rowcount} interrupted tasks requeued")
+        return cursor.rowcount
+
+    @staticmethod
+    def _filter(query, params, stage, images, artifacts=None):
+        if stage is not None:
+            query += " AND stage = ?"
+            params.append(stage)
+        if images is not None:
+            images = list(images)
+            query += f" AND image IN ({', '.join('?' * len(images))})"
+            params.extend(images)
+        if artifacts is not None:
+            artifacts = list(artifacts)
+            query += f" AND artifact IN ({', '.join('?' * len(artifacts))})"
+            params.extend(artifacts)
+        return query, params
+
+    def claim(self, stage=None, images=None, artifacts=None):
+        """Atomically take the oldest runnable task (pending, or failed and due for retry)"""
+        now = time.time()
+        query, params = self._filter("SELECT * FROM tasks WHERE status IN (?, ?) AND next_attempt <= ?",
+                                     [PENDING, FAILED, now], stage, images, artifacts)
+        query += " ORDER BY id LIMIT 1"
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(query, params).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute("UPDATE tasks SET status = ?, updated = ? WHERE id = ?", (RUNNING, now, row['id']))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return dict(row, status=RUNNING)
+
+    def complete(self, task, result=None):
+        self.conn.execute("UPDATE tasks SET status = ?, result = ?, last_error = NULL, updated = ? WHERE id = ?",
+                          (DONE, json.dumps(result), time.time(), task['id']))
+
+    def fail(self, task, error, permanent=False):
+        """Record a failure and schedule a retry, or mark the task dead once attempts run out (or permanent=True)"""
+        attempts = task['attempts'] + 1
+        delay = min(self.backoff_base * (2 ** (attempts - 1)), self.backoff_max)
+        status = DEAD if permanent or attempts >= self.max_attempts else FAILED
+        self.conn.execute(
+            "UPDATE tasks SET status = ?, attempts = ?, next_attempt = ?, last_error = ?, updated = ? WHERE id = ?",
+            (status, attempts, time.time() + delay, str(error), time.time(), task['id']))
+        logger.warning(f"Task {task['image']} / {task['artifact']} / {task['stage']} failed "
+                       f"(attempt {attempts}/{self.max_attempts}): {error}")
+        return status
+
+    def get(self, image, artifact, stage="extract"):
+        row = self.conn.execute("SELECT * FROM tasks WHERE image = ? AND artifact = ? AND stage = ?",
+                                (image, artifact, stage)).fetchone()
+        return dict(row) if row else None
+
+    def tasks(self, stage=None, images=None, artifacts=None):
+        query, params = self._filter("SELECT * FROM tasks WHERE 1", [], stage, images, artifacts)
+        return [dict(row) for row in self.conn.execute(query + " ORDER BY id", params)]
+
+    def is_done(self, image, artifact, stage="extract"):
+        task = self.get(image, artifact, stage)
+        return task is not None and task['status'] == DONE
+
+    def result(self, task):
+        return json.loads(task['result']) if task.get('result') else None
+
+    def next_retry_in(self, stage=None, images=None, artifacts=None):
+        """Seconds until the next failed task is due, or None when nothing is left to retry"""
+        query, params = self._filter("SELECT MIN(next_attempt) FROM tasks WHERE status IN (?, ?)",
+                                     [PENDING, FAILED], stage, images, artifacts)
+        due = self.conn.execute(query, params).fetchone()[0]
+        if due is None:
+            return None
+        return max(0.0, due - time.time())
+
+    def counts(self, stage=None, images=None, artifacts=None):
+        query, params = self._filter("SELECT status, COUNT(*) FROM tasks WHERE 1", [], stage, images, artifacts)
+        return dict(self.conn.execute(query + " GROUP BY status", params).fetchall())
+
+    def reset(self, status=DEAD, images=None):
+        """Give tasks in the given state (dead by default) a fresh set of attempts, only for images if given"""
+        query, params = self._filter("UPDATE tasks SET status = ?, attempts = 0, next_attempt = 0, updated = ? WHERE status = ?",
+                                     [PENDING, time.time(), status], None, images)
+        self.conn.execute(query, params)
+
+    def close(self):
+        self.conn.close()
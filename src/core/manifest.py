@@ -0,0 +1,151 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+from src.core.artifacts import classify, legacy_source_path
+
+logger = logging.getLogger("ForensicAnalyzer")
+
+
+class WorkspaceManifest:
+    """
+    Index of everything extracted into one image workspace.
+
+    Each extracted file is recorded with its original path in the image, the
+    volume it came from ('' for the primary volume), its artifact type, the
+    user folder it belongs to and where it was saved (relative to the
+    workspace), so consumers find artifacts with one indexed query instead of
+    rebuilding the flattened folder names.
+    """
+
+    def __init__(self, workspace, batch_size=500):
+        self.workspace = os.path.abspath(workspace)
+        self.db_path = os.path.join(self.workspace, "manifest.db")
+        self.batch_size = batch_size
+        self._pending = []
+        # Saved path -> (volume, source path) claimed in this session, including rows not flushed yet
+        self._claimed = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(self.workspace, exist_ok=True)
+        is_new = not os.path.exists(self.db_path)
+        self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(files)")]
+        if columns and 'volume' not in columns:
+            # Manifests written before multi-volume scanning only ever held the primary volume
+            self.conn.execute("ALTER TABLE files RENAME TO files_single_volume")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                volume TEXT NOT NULL DEFAULT '',
+                source_path TEXT NOT NULL,
+                saved_path TEXT NOT NULL,
+                artifact TEXT,
+                user TEXT,
+                size INTEGER,
+                extracted REAL,
+                PRIMARY KEY (volume, source_path)
+            )""")
+        if columns and 'volume' not in columns:
+            self.conn.execute("INSERT INTO files (source_path, saved_path, artifact, user, size, extracted) "
+                              "SELECT source_path, saved_path, artifact, user, size, extracted FROM files_single_volume")
+            self.conn.execute("DROP TABLE files_single_volume")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_files_artifact ON files (artifact, user)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_files_saved ON files (saved_path)")
+        self.conn.commit()
+        if is_new:
+            self._backfill()
+
+    def _backfill(self):
+        """Index files a previous version extracted before manifests existed"""
+        for root, _, files in os.walk(self.workspace):
+            rel_dir = os.path.relpath(root, self.workspace)
+            if rel_dir == ".":
+                continue  # top-level files are exports, not extracted evidence
+            for name in files:
+                source_path = legacy_source_path(rel_dir, name)
+                if source_path:
+                    saved_path = os.path.join(root, name)
+                    self.record(source_path, saved_path, os.path.getsize(saved_path))
+        if self._pending:
+            logger.info(f"Manifest backfilled {len(self._pending)} files in {self.workspace}")
+        self.flush()
+
+    def claim_path(self, saved_path, source_path, volume=""):
+        """
+        Reserve saved_path for this file. False if a different file (from an
+        earlier run, another manager or another volume) already owns it.
+        """
+        saved_path = os.path.relpath(saved_path, self.workspace)
+        owner = (volume, '/' + source_path.replace('\\', '/').lstrip('/'))
+        with self._lock:
+            current = self._claimed.get(saved_path)
+            if current is None:
+                row = self.conn.execute("SELECT volume, source_path FROM files WHERE saved_path = ?",
+                                        (saved_path,)).fetchone()
+                current = self._claimed[saved_path] = tuple(row) if row else owner
+        return current == owner
+
+    def record(self, source_path, saved_path, size, volume=""):
+        source_path = '/' + source_path.replace('\\', '/').lstrip('/')
+        artifact, user = classify(source_path)
+        row = (volume, source_path, os.path.relpath(saved_path, self.workspace), artifact, user, size, time.time())
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) < self.batch_size:
+                return
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            rows, self._pending = self._pending, []
+            if rows:
+                self.conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self.conn.commit()
+
+    def _query(self, artifact, user=None):
+        query = "SELECT volume, source_path, saved_path, user, size FROM files WHERE artifact = ?"
+        params = [artifact]
+        if user is not None:
+            query += " AND user = ? COLLATE NOCASE"
+            params.append(user)
+        with self._lock:
+            # Primary volume ('') first, so find() prefers it
+            rows = self.conn.execute(query + " ORDER BY volume, source_path", params).fetchall()
+        return [{'volume': volume, 'source_path': source, 'path': os.path.join(self.workspace, saved),
+                 'user': owner, 'size': size}
+                for volume, source, saved, owner, size in rows]
+
+    def find(self, artifact, user=None):
+        """Saved path of the first file of this artifact type (optionally for one user), or None; the primary volume wins"""
+        rows = self._query(artifact, user)
+        return rows[0]['path'] if rows else None
+
+    def find_all(self, artifact, user=None):
+        return self._query(artifact, user)
+
+    def last_extracted(self):
+        """Time of the most recent extraction recorded here, or None"""
+        self.flush()
+        with self._lock:
+            return self.conn.execute("SELECT MAX(extracted) FROM files").fetchone()[0]
+
+    def users(self, artifact=None):
+        query = "SELECT DISTINCT user FROM files WHERE user IS NOT NULL"
+        params = []
+        if artifact is not None:
+            query += " AND artifact = ?"
+            params.append(artifact)
+        with self._lock:
+            return [row[0] for row in self.conn.execute(query + " ORDER BY user", params)]
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,164 @@
+import os
+import sys
+import pickle
+import logging
+import tempfile
+import threading
+
+from src.core.metrics import metrics
+from src.core.timeline_merge import merge_timelines, time_key
+
+logger = logging.getLogger("ForensicAnalyzer")
+
+MB = 1024 * 1024
+
+
+class MemoryBudget:
+    """
+    Process-wide accounting of the large, long-lived allocations: read-ahead
+    caches, in-memory sort buffers and parse workers in flight.
+
+    Holders reserve an estimate before they allocate and release it when done.
+    reserve() fails fast when the estimate does not fit, and the caller adapts:
+    read-ahead caches shrink, sort buffers spill to disk and the stage
+    scheduler holds ready stages back until running ones finish.
+
+    The budget is per process. A parse stage's worker process is limited to
+    the share its parent reserved for it (set_limit), so the pool as a whole
+    stays within the parent's budget.
+    """
+
+    def __init__(self, limit=None):
+        if limit is None:
+            limit = int(os.environ.get("VDI_MEMORY_BUDGET_MB", "2048")) * MB
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def available(self):
+        with self._lock:
+            return max(self.limit - self.used, 0)
+
+    def set_limit(self, limit):
+        """Change the limit, e.g. to the share a parent process reserved for this one"""
+        with self._lock:
+            self.limit = limit
+
+    def reserve(self, nbytes, force=False):
+        """Reserve nbytes; returns False if they do not fit (force=True reserves them regardless)"""
+        with self._lock:
+            if not force and self.used + nbytes > self.limit:
+                return False
+            self.used += nbytes
+            self.peak = max(self.peak, self.used)
+            return True
+
+    def release(self, nbytes):
+        with self._lock:
+            self.used = max(self.used - nbytes, 0)
+
+    def status(self):
+        with self._lock:
+            return {'limit_mb': self.limit / MB, 'used_mb': self.used / MB, 'peak_mb': self.peak / MB}
+
+
+budget = MemoryBudget()
+
+
+def estimate_size(row):
+    """Rough in-memory size of a parser row (Record or dict) including its string values"""
+    if isinstance(row, dict):
+        values = row.values()
+    else:
+        values = (getattr(row, name, None) for name in getattr(row, '__slots__', ()))
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in values)
+
+
+def _read_run(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+class SpillBuffer:
+    """
+    Sort buffer that stays within a memory bound.
+
+    Rows are kept in memory until the buffer reaches max_bytes or the global
+    budget has no room left; the buffer is then sorted and written to disk as
+    a run. Iterating merges the runs and the in-memory rest with
+    merge_timelines, so only one row per run is held at a time.
+
+    key is a field name (compared with time_key, like merge_timelines) or a
+    callable; reverse=True gives newest-first order.
+    """
+
+    def __init__(self, key='time', reverse=True, max_bytes=64 * MB, spill_dir=None, memory=None):
+        if isinstance(key, str):
+            field = key
+            key = lambda row: time_key(row[field])
+        self.key = key
+        self.reverse = reverse
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.memory = memory or budget
+        self._rows = []
+        self._bytes = 0
+        self._runs = []
+        self._count = 0
+
+    def add(self, row):
+        size = estimate_size(row)
+        if not (self._bytes + size <= self.max_bytes and self.memory.reserve(size)):
+            if self._rows:
+                self._spill()
+            # A lone row always goes in, so progress never waits on the budget
+            self.memory.reserve(size, force=True)
+        self._rows.append(row)
+        self._bytes += size
+        self._count += 1
+
+    def extend(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def _spill(self):
+        self._rows.sort(key=self.key, reverse=self.reverse)
+        fd, path = tempfile.mkstemp(prefix="spill_", suffix=".run", dir=self.spill_dir)
+        with os.fdopen(fd, 'wb') as f:
+            for row in self._rows:
+                pickle.dump(row, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._runs.append(path)
+        metrics.incr('spill_runs')
+        metrics.incr('spilled_rows', len(self._rows))
+        logger.debug(f"Spilled {len(self._rows)} rows ({self._bytes / MB:.1f} MB) to {path}")
+        self.memory.release(self._bytes)
+        self._rows = []
+        self._bytes = 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        """All rows in sorted order; the buffer is consumed and its runs deleted afterwards"""
+        self._rows.sort(key=self.key, reverse=self.reverse)
+        streams = [_read_run(path) for path in self._runs] + [iter(self._rows)]
+        try:
+            yield from merge_timelines(streams, key=self.key, reverse=self.reverse)
+        finally:
+            self.close()
+
+    def close(self):
+        self.memory.release(self._bytes)
+        self._rows = []
+        self._bytes = 0
+        for path in self._runs:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._runs = []
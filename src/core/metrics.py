@@ -0,0 +1,173 @@
+import os
+import sys
+import json
+import time
+import signal
+import shutil
+import logging
+import threading
+import subprocess
+from collections import defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger("ForensicAnalyzer")
+
+
+class Metrics:
+    """
+    Process-wide counters and per-stage timers.
+
+    Counters are free-form (bytes read from the image, bytes written, files
+    extracted, records parsed, cache hits/misses). Stages accumulate call
+    count, wall time and CPU time of the calling thread. A pair of counters
+    named <name>_hits / <name>_misses is reported with a <name>_hit_rate.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = defaultdict(int)
+            self.stages = {}
+            self.started = time.time()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    @contextmanager
+    def stage(self, name):
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            with self._lock:
+                stats = self.stages.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0})
+                stats['calls'] += 1
+                stats['wall_s'] += wall
+                stats['cpu_s'] += cpu
+
+    def merge(self, report):
+        """Add the counters and stage times of a snapshot taken in another process"""
+        with self._lock:
+            for name, value in report.get('counters', {}).items():
+                self.counters[name] += value
+            for name, other in report.get('stages', {}).items():
+                stats = self.stages.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0})
+                for key in stats:
+                    stats[key] += other.get(key, 0)
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self.counters)
+            stages = {name: dict(stats) for name, stats in self.stages.items()}
+            elapsed = time.time() - self.started
+
+        rates = {}
+        for name in counters:
+            if name.endswith("_hits"):
+                base = name[:-len("_hits")]
+                total = counters[name] + counters.get(base + "_misses", 0)
+                if total:
+                    rates[base + "_hit_rate"] = counters[name] / total
+        return {
+            'started': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+            'elapsed_s': elapsed,
+            'counters': counters,
+            'rates': rates,
+            'stages': stages,
+        }
+
+    def log_summary(self):
+        report = self.snapshot()
+        for name, stats in sorted(report['stages'].items()):
+            logger.info(f"[METRICS] {name}: {stats['calls']} calls, "
+                        f"{stats['wall_s']:.2f}s wall, {stats['cpu_s']:.2f}s CPU")
+        for name, value in sorted(report['counters'].items()):
+            logger.info(f"[METRICS] {name} = {value}")
+        for name, value in sorted(report['rates'].items()):
+            logger.info(f"[METRICS] {name} = {value:.1%}")
+
+    def write_report(self, report_path):
+        """Write the snapshot as JSON for later comparison between runs"""
+        try:
+            report_dir = os.path.dirname(report_path)
+            if report_dir:
+                os.makedirs(report_dir, exist_ok=True)
+            temp_path = report_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, indent=2)
+            os.replace(temp_path, report_path)
+            logger.info(f"Run report written: {report_path}")
+        except Exception as e:
+            logger.error(f"Run report write failed: {e}")
+
+
+metrics = Metrics()
+
+
+def setup_logging(level=None):
+    """Attach a console handler to the tool logger; level from VDI_LOG_LEVEL (default INFO)"""
+    level = level or os.environ.get("VDI_LOG_LEVEL", "INFO")
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+
+
+@contextmanager
+def profiling(name, mode=None, output_dir="workspace"):
+    """
+    Optionally profile the enclosed block.
+
+    mode (or VDI_PROFILE) selects "cprofile", which profiles the calling thread
+    into <output_dir>/<name>.prof, or "py-spy", which samples the whole process
+    into <output_dir>/<name>.svg when py-spy is on PATH. Anything else is a no-op.
+    """
+    mode = (mode or os.environ.get("VDI_PROFILE", "")).lower()
+    if mode not in ("cprofile", "py-spy"):
+        yield
+        return
+
+    os.makedirs(output_dir, exist_ok=True)
+    if mode == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            output_path = os.path.join(output_dir, f"{name}.prof")
+            profiler.dump_stats(output_path)
+            logger.info(f"cProfile stats written: {output_path}")
+        return
+
+    py_spy = shutil.which("py-spy")
+    if not py_spy:
+        logger.warning("VDI_PROFILE=py-spy but py-spy is not installed; profiling disabled")
+        yield
+        return
+
+    output_path = os.path.join(output_dir, f"{name}.svg")
+    proc = subprocess.Popen([py_spy, "record", "--pid", str(os.getpid()), "--output", output_path],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        yield
+    finally:
+        # py-spy writes the flame graph when interrupted
+        if os.name != "nt":
+            proc.send_signal(signal.SIGINT)
+        else:
+            proc.terminate()
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        logger.info(f"py-spy flame graph written: {output_path}")
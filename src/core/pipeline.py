@@ -0,0 +1,337 @@
+import os
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from Evtx import Evtx as evtx_module
+
+from src.core.manifest import WorkspaceManifest
+from src.core.job_queue import PermanentError
+from src.core.session_builder import SessionBuilder, event_fields, SESSION_EVENTS, LOGON_EVENTS
+from src.core.sid_mapper import SIDMapper
+from src.core.hive_cache import HiveCache
+from src.core.evtx_watermark import IncrementalReader, WatermarkStore
+from src.core.timeline_merge import merge_timelines, tag_stream
+from src.core.exporter import EXPORT_FORMATS, export_rows
+from src.core.memory import MB, budget
+from src.core.metrics import metrics
+from src.parser.edge_history_parser import EdgeHistoryParser
+from src.parser.prefetch_parser import PrefetchParser
+
+logger = logging.getLogger("ForensicAnalyzer")
+
+
+def image_workspace(workspace, image):
+    """Same per-image folder EvidenceManager creates"""
+    return os.path.abspath(os.path.join(workspace, os.path.basename(image).replace(".", "_")))
+
+
+# Per-image output file of each parse stage (without extension), inside the image workspace
+STAGE_OUTPUTS = {
+    'prefetch': "prefetch_timeline",
+    'edge': "edge_history",
+    'sessions': "logon_sessions",
+    'sid_map': "sid_map",
+}
+
+
+def stage_output(image_ws, stage):
+    """A stage's output in an image workspace, or None if missing or older than the last extraction"""
+    for fmt in EXPORT_FORMATS:
+        path = os.path.join(image_ws, f"{STAGE_OUTPUTS[stage]}.{fmt}")
+        if os.path.exists(path):
+            break
+    else:
+        return None
+    with WorkspaceManifest(image_ws) as manifest:
+        extracted = manifest.last_extracted()
+    if extracted is not None and os.path.getmtime(path) < extracted:
+        return None
+    return path
+
+
+def _output_path(image, workspace, stage, fmt):
+    return os.path.join(image_workspace(workspace, image), f"{STAGE_OUTPUTS[stage]}.{fmt}")
+
+
+# Parse stages: (image path, workspace base, export format) -> {'rows': n, 'output': path}
+# They run in worker processes, so they only take and return plain values.
+
+def run_prefetch_stage(image, workspace, fmt):
+    ws = image_workspace(workspace, image)
+    with WorkspaceManifest(ws) as manifest:
+        pf_files = [f['path'] for f in manifest.find_all('prefetch') if f['path'].lower().endswith('.pf')]
+    output_path = _output_path(image, workspace, 'prefetch', fmt)
+    if not pf_files:
+        return {'rows': 0, 'output': None}
+
+    parser = PrefetchParser(pecmd_path=os.path.join(os.getcwd(), "tools", "PECmd.exe"))
+    if not os.path.exists(parser.pecmd_path):
+        # Left undone, so the next run parses the prefetch once PECmd is installed
+        raise PermanentError(f"PECmd not found at {parser.pecmd_path}; prefetch parsing skipped")
+    output_dir = os.path.join(ws, "Analysis_Results")
+    if not parser.execute_pecmd(os.path.dirname(pf_files[0]), output_dir):
+        raise RuntimeError(f"PECmd failed on {len(pf_files)} prefetch files")
+    rows = tag_stream(parser.iter_pecmd_csv(output_dir), source=os.path.basename(image))
+    return {'rows': export_rows(rows, output_path, 'prefetch', fmt=fmt), 'output': output_path}
+
+
+def run_edge_stage(image, workspace, fmt):
+    vhd_id = os.path.basename(image)
+    with WorkspaceManifest(image_workspace(workspace, image)) as manifest:
+        histories = manifest.find_all('edge_history')
+    parser = EdgeHistoryParser()
+
+    # Merged newest-first, so any one user's rows come out in timeline order too
+    visits = merge_timelines([tag_stream(parser.iter_parse(history['path']), source=vhd_id, folder_name=history['user'])
+                              for history in histories], key='time')
+    output_path = _output_path(image, workspace, 'edge', fmt)
+    return {'rows': export_rows(visits, output_path, 'edge', fmt=fmt), 'output': output_path}
+
+
+def run_sessions_stage(image, workspace, fmt):
+    vhd_id = os.path.basename(image)
+    with WorkspaceManifest(image_workspace(workspace, image)) as manifest:
+        logs = [log['path'] for artifact in ['security_evtx', 'lsm_evtx'] for log in manifest.find_all(artifact)]
+    builder = SessionBuilder()
+
+    def sessions():
+        for log_path in logs:
+            yield from builder.build(log_path, vhd_id)
+
+    output_path = _output_path(image, workspace, 'sessions', fmt)
+    return {'rows': export_rows(sessions(), output_path, 'sessions', fmt=fmt), 'output': output_path}
+
+
+def _security_events(log_path, log_key, vhd_id, mapper, watermarks):
+    """Session events of one Security log; 4624s past its watermark are also merged into mapper"""
+    records_read = 0
+    try:
+        with evtx_module.Evtx(log_path) as log:
+            reader = IncrementalReader(log, os.path.getsize(log_path), watermarks.get(vhd_id, log_key))
+            for record, new in reader.all_records():
+                records_read += 1
+                event = event_fields(record, SESSION_EVENTS)
+                if event is None:
+                    continue
+                if new and event[0] in LOGON_EVENTS:
+                    mapper.add_logon(event[2], event[1], vhd_id)
+                yield event
+            mark = reader.watermark()
+            if mark:
+                watermarks.set(vhd_id, log_key, mark)
+            logger.info(f"{vhd_id}/{log_key}: {records_read} records, {reader.new_records} new for the SID map")
+    finally:
+        metrics.incr('evtx_records', records_read)
+
+
+def run_sid_map_stage(image, workspace, fmt):
+    """
+    SID mapping for one image; MappingThread still merges all images into the case map.
+
+    Each Security log is read once for both outputs: every record goes to the
+    logon sessions (written here too, so the sessions stage is not scheduled
+    alongside this one) and records past the image's watermark go to the map.
+    The hive cache, watermarks and map state live in the image workspace, so
+    re-runs only parse what changed and parallel stages never share a file.
+    """
+    vhd_id = os.path.basename(image)
+    ws = image_workspace(workspace, image)
+    with WorkspaceManifest(ws) as manifest:
+        software_path = manifest.find('software_hive')
+        sam_path = manifest.find('sam_hive')
+        ntusers = manifest.find_all('ntuser')
+        security_logs = [log['path'] for log in manifest.find_all('security_evtx')]
+        lsm_logs = [log['path'] for log in manifest.find_all('lsm_evtx')]
+
+    hive_cache = HiveCache(os.path.join(ws, "hive_cache.json"))
+    mapper = SIDMapper(hive_cache=hive_cache)
+    state_path = os.path.join(ws, "sid_map_state.json")
+    watermarks = WatermarkStore(os.path.join(ws, "evtx_watermarks.json"))
+    if not mapper.load_state(state_path, vhd_ids={vhd_id}):
+        watermarks.clear()
+
+    if software_path:
+        mapper.parse_software_hive(software_path, vhd_id)
+
+    builder = SessionBuilder()
+
+    def sessions():
+        for log_path in security_logs:
+            # Keyed by the path in the workspace: every volume has its own Security.evtx
+            log_key = os.path.relpath(log_path, ws).replace(os.sep, '/')
+            yield from builder.build_events(_security_events(log_path, log_key, vhd_id, mapper, watermarks),
+                                            vhd_id, log_path)
+        for log_path in lsm_logs:
+            yield from builder.build(log_path, vhd_id)
+
+    sessions_path = _output_path(image, workspace, 'sessions', fmt)
+    session_rows = export_rows(sessions(), sessions_path, 'sessions', fmt=fmt)
+
+    if sam_path:
+        mapper.parse_sam_hive(sam_path)
+    for ntuser in ntusers:
+        mapper.parse_ntuser_hive(ntuser['path'], vhd_id, folder_name=ntuser['user'])
+
+    hive_cache.save()
+    mapper.save_state(state_path)
+    watermarks.save()
+
+    output_path = _output_path(image, workspace, 'sid_map', fmt)
+    mapper.deduplicate_map()
+    return {'rows': export_rows(mapper.master_map, output_path, 'mapping', fmt=fmt), 'output': output_path,
+            'sessions': {'rows': session_rows, 'output': sessions_path}}
+
+
+class ArtifactSpec:
+    """
+    An artifact the pipeline knows how to handle: what to extract and which
+    stage parses it. `after` names other artifacts whose extraction the parse
+    stage should also wait for when they are part of the same run; `covers`
+    names artifacts whose stage output this stage writes as well, so their own
+    stage is dropped when both are scheduled.
+    """
+
+    def __init__(self, name, targets, stage, parse, after=(), covers=()):
+        self.name = name
+        self.targets = list(targets)
+        self.stage = stage
+        self.parse = parse
+        self.after = list(after)
+        self.covers = list(covers)
+
+
+ARTIFACT_SPECS = [
+    ArtifactSpec("Prefetch", ['Windows/Prefetch'], 'prefetch', run_prefetch_stage),
+    ArtifactSpec("Edge History", ['Users/*/AppData/Local/Microsoft/Edge/User Data/Default/History'],
+                 'edge', run_edge_stage),
+    ArtifactSpec("Security Logs", ['Windows/System32/winevt/Logs/Security.evtx',
+                                   'Windows/System32/winevt/Logs/Microsoft-Windows-TerminalServices-LocalSessionManager%4Operational.evtx'],
+                 'sessions', run_sessions_stage),
+    ArtifactSpec("SOFTWARE Hive (Registry)", ['Windows/System32/config/SOFTWARE', 'Windows/System32/config/SAM',
+                                              'Users/*/NTUSER.DAT'],
+                 'sid_map', run_sid_map_stage, after=["Security Logs"], covers=["Security Logs"]),
+]
+
+STAGE_HANDLERS = {spec.stage: spec.parse for spec in ARTIFACT_SPECS}
+PARSE_STAGES = [spec.stage for spec in ARTIFACT_SPECS]
+
+
+def scheduled_stages(stages, specs=ARTIFACT_SPECS):
+    """stages without those another one in the list already covers"""
+    by_name = {spec.name: spec.stage for spec in specs}
+    covered = {by_name[name] for spec in specs if spec.stage in stages for name in spec.covers}
+    return [stage for stage in stages if stage not in covered]
+
+
+def _run_stage(stage, image, workspace, fmt, memory_limit=None):
+    # Pool processes are reused; start each stage from zero so its metrics can be merged in the parent
+    metrics.reset()
+    if memory_limit is not None:
+        # The parent charged this slot to its budget; the stage's buffers and caches must fit in it
+        budget.set_limit(memory_limit)
+    started = time.perf_counter()
+    try:
+        with metrics.stage(stage):
+            result = {'ok': True, 'data': STAGE_HANDLERS[stage](image, workspace, fmt)}
+    except Exception as e:
+        result = {'ok': False, 'error': f"{type(e).__name__}: {e}", 'permanent': isinstance(e, PermanentError)}
+    result.update(stage=stage, image=image, elapsed_s=time.perf_counter() - started, metrics=metrics.snapshot())
+    return result
+
+
+class StageScheduler:
+    """
+    Dependency-driven parse scheduling alongside extraction.
+
+    The caller reports every (image, target) it finishes extracting; as soon
+    as all inputs of an artifact's parse stage are in for an image, that stage
+    is submitted to a process pool. CPU-bound parsing of one image thus runs
+    while the next image is still being read.
+
+    Every stage in flight is charged stage_memory against the memory budget;
+    when the budget is spent, ready stages wait until running ones finish.
+    """
+
+    def __init__(self, targets, workspace="workspace", fmt="csv", specs=ARTIFACT_SPECS, cpu_workers=None,
+                 stage_memory=256 * MB, memory=None):
+        targets = set(targets)
+        self.workspace = workspace
+        self.fmt = fmt
+        self.stage_memory = stage_memory
+        self.memory = memory or budget
+        # Only artifacts whose targets are all part of this run, minus stages another one covers
+        present = [spec for spec in specs if set(spec.targets) <= targets]
+        stages = scheduled_stages([spec.stage for spec in present], specs)
+        self.specs = [spec for spec in present if spec.stage in stages]
+        by_name = {spec.name: spec for spec in present}
+        self._requires = {}
+        for spec in self.specs:
+            required = set(spec.targets)
+            for name in spec.after:
+                if name in by_name:
+                    required |= set(by_name[name].targets)
+            self._requires[spec.stage] = required
+
+        self._extracted = {}
+        self._submitted = set()
+        self._ready = []
+        self._futures = set()
+        self._pool = None
+        if self.specs:
+            self._pool = ProcessPoolExecutor(max_workers=cpu_workers or max(1, (os.cpu_count() or 2) - 1),
+                                             mp_context=multiprocessing.get_context("spawn"))
+
+    def extracted(self, image, target, skip_stages=()):
+        """Record a finished extraction; submits (or, short of memory, queues) every parse stage it completes"""
+        done = self._extracted.setdefault(image, set())
+        done.add(target)
+        submitted = []
+        for spec in self.specs:
+            key = (image, spec.stage)
+            if key in self._submitted or not self._requires[spec.stage] <= done:
+                continue
+            self._submitted.add(key)
+            if spec.stage in skip_stages:
+                continue
+            self._ready.append((spec.stage, image))
+            submitted.append(spec.stage)
+        self._submit_ready()
+        return submitted
+
+    def _submit_ready(self):
+        while self._ready:
+            # With nothing running, one stage always goes so the pipeline cannot stall on the budget
+            if not self.memory.reserve(self.stage_memory, force=not self._futures):
+                metrics.incr('memory_throttled')
+                return
+            stage, image = self._ready.pop(0)
+            self._futures.add(self._pool.submit(_run_stage, stage, image, self.workspace, self.fmt,
+                                                self.stage_memory))
+
+    def spec(self, stage):
+        for spec in self.specs:
+            if spec.stage == stage:
+                return spec
+        return None
+
+    def pending(self):
+        """Stages running or waiting for memory"""
+        return len(self._futures) + len(self._ready)
+
+    def results(self, block=False):
+        """Finished stage results; with block=True, wait for at least one unless nothing is pending"""
+        if not self._futures:
+            return []
+        done, self._futures = wait(self._futures, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        self.memory.release(self.stage_memory * len(done))
+        self._submit_ready()
+        results = [future.result() for future in done]
+        for result in results:
+            metrics.merge(result.pop('metrics'))
+        return results
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
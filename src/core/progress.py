@@ -0,0 +1,73 @@
+import time
+import threading
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--:--:--"
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class ProgressTracker:
+    """
+    Byte-based progress per image and overall.
+
+    Totals come from filesystem metadata before extraction starts, so a 4 KB
+    hive and a 2 GB directory weigh what they actually cost. Throughput is
+    measured from the first byte of each image (and of the whole run).
+    """
+
+    def __init__(self, totals):
+        self.totals = dict(totals)
+        self.done = {image: 0 for image in self.totals}
+        self._started = {}
+        self._finished = {}
+        self._run_started = None
+        self._lock = threading.Lock()
+
+    def start(self, image):
+        now = time.perf_counter()
+        with self._lock:
+            self._started.setdefault(image, now)
+            if self._run_started is None:
+                self._run_started = now
+
+    def advance(self, image, nbytes):
+        with self._lock:
+            self.done[image] = self.done.get(image, 0) + nbytes
+
+    def finish(self, image):
+        with self._lock:
+            self._finished[image] = time.perf_counter()
+
+    @staticmethod
+    def _status(done, total, elapsed):
+        rate = done / elapsed if elapsed > 0 else 0.0
+        remaining = max(total - done, 0)
+        return {
+            'done': done,
+            'total': total,
+            'percent': min(100, int(done * 100 / total)) if total else 100,
+            'mb_per_s': rate / (1024 * 1024),
+            'eta_s': remaining / rate if rate > 0 else None,
+        }
+
+    def image_status(self, image):
+        with self._lock:
+            started = self._started.get(image)
+            end = self._finished.get(image, time.perf_counter())
+            done = self.done.get(image, 0)
+        elapsed = end - started if started is not None else 0
+        return self._status(done, self.totals.get(image, 0), elapsed)
+
+    def overall_status(self):
+        with self._lock:
+            done = sum(self.done.values())
+            elapsed = time.perf_counter() - self._run_started if self._run_started is not None else 0
+        return self._status(done, sum(self.totals.values()), elapsed)
+
+    @staticmethod
+    def describe(status):
+        return (f"{status['done'] / (1024 * 1024):.1f}/{status['total'] / (1024 * 1024):.1f} MB "
+                f"({status['percent']}%), {status['mb_per_s']:.1f} MB/s, ETA {format_eta(status['eta_s'])}")
@@ -0,0 +1,171 @@
+import queue
+import logging
+import threading
+from collections import OrderedDict
+
+from src.core.metrics import metrics
+from src.core.memory import budget
+
+logger = logging.getLogger("ForensicAnalyzer")
+
+
+class ReadAheadReader:
+    """
+    Sequential-stream detector and block prefetcher for an image handle.
+
+    Reads that continue where the previous one ended build up a streak; once
+    the streak is long enough, reads are served from fixed-size blocks and the
+    next blocks are read (and, for E01, decompressed) on a background thread
+    through a second handle, so the caller's next read is already in memory.
+    The prefetch window doubles while the stream stays sequential. Random
+    reads (filesystem metadata) bypass the cache and go straight to the handle.
+
+    handle and prefetch_handle must be independent objects with seek/read;
+    the background thread only ever touches prefetch_handle.
+    """
+
+    def __init__(self, handle, size, prefetch_handle, block_size=1024 * 1024,
+                 cache_blocks=64, min_window=2, max_window=16, sequential_threshold=2):
+        self.handle = handle
+        self.size = size
+        self.block_size = block_size
+        # The cache is charged to the memory budget; with little room left it shrinks instead
+        while not budget.reserve(cache_blocks * block_size):
+            if cache_blocks <= 2 * min_window:
+                budget.reserve(cache_blocks * block_size, force=True)
+                break
+            cache_blocks //= 2
+        self.cache_blocks = cache_blocks
+        self.min_window = min_window
+        self.max_window = min(max_window, cache_blocks // 2)
+        self.sequential_threshold = sequential_threshold
+
+        self._prefetch_handle = prefetch_handle
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._last_end = None
+        self._streak = 0
+        self._window = min_window
+        self._closed = False
+        self._thread = threading.Thread(target=self._prefetch_loop, name="image-readahead", daemon=True)
+        self._thread.start()
+
+    def read(self, offset, size):
+        if self._closed or size <= 0:
+            self.handle.seek(offset)
+            return self.handle.read(size)
+
+        if offset == self._last_end:
+            self._streak += 1
+            if self._streak > self.sequential_threshold:
+                self._window = min(self._window * 2, self.max_window)
+        else:
+            self._streak = 0
+            self._window = self.min_window
+        self._last_end = offset + size
+
+        first = offset // self.block_size
+        last = (offset + size - 1) // self.block_size
+        cached = self._cached_range(first, last)
+        if cached is None and self._streak < self.sequential_threshold:
+            metrics.incr('readahead_misses')
+            self.handle.seek(offset)
+            return self.handle.read(size)
+
+        if cached is not None:
+            metrics.incr('readahead_hits')
+            blocks = cached
+        else:
+            metrics.incr('readahead_misses')
+            blocks = [self._block(index) for index in range(first, last + 1)]
+        if self._streak >= self.sequential_threshold:
+            self._schedule(last + 1, last + self._window)
+
+        data = b"".join(blocks)
+        start = offset - first * self.block_size
+        return data[start:start + size]
+
+    def _cached_range(self, first, last):
+        with self._lock:
+            blocks = []
+            for index in range(first, last + 1):
+                block = self._cache.get(index)
+                if block is None:
+                    return None
+                self._cache.move_to_end(index)
+                blocks.append(block)
+            return blocks
+
+    def _block(self, index):
+        """Block from the cache, waiting on an in-flight prefetch or reading it in the foreground"""
+        with self._lock:
+            block = self._cache.get(index)
+            if block is not None:
+                self._cache.move_to_end(index)
+                return block
+            pending = self._inflight.get(index)
+        if pending is not None:
+            pending.wait()
+            with self._lock:
+                block = self._cache.get(index)
+            if block is not None:
+                return block
+
+        offset = index * self.block_size
+        self.handle.seek(offset)
+        block = self.handle.read(min(self.block_size, self.size - offset))
+        self._store(index, block)
+        return block
+
+    def _store(self, index, block):
+        with self._lock:
+            self._cache[index] = block
+            self._cache.move_to_end(index)
+            while len(self._cache) > self.cache_blocks:
+                self._cache.popitem(last=False)
+
+    def _schedule(self, first, last):
+        last = min(last, (self.size - 1) // self.block_size)
+        with self._lock:
+            for index in range(first, last + 1):
+                if index in self._cache or index in self._inflight:
+                    continue
+                self._inflight[index] = threading.Event()
+                self._requests.put(index)
+
+    def _prefetch_loop(self):
+        while True:
+            index = self._requests.get()
+            if index is None:
+                return
+            try:
+                offset = index * self.block_size
+                self._prefetch_handle.seek(offset)
+                self._store(index, self._prefetch_handle.read(min(self.block_size, self.size - offset)))
+                metrics.incr('readahead_prefetched_bytes', min(self.block_size, self.size - offset))
+            except Exception as e:
+                logger.debug(f"Read-ahead of block {index} failed: {e}")
+            finally:
+                with self._lock:
+                    event = self._inflight.pop(index, None)
+                if event is not None:
+                    event.set()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        budget.release(self.cache_blocks * self.block_size)
+        self._requests.put(None)
+        self._thread.join(timeout=5)
+        with self._lock:
+            for event in self._inflight.values():
+                event.set()
+            self._inflight.clear()
+            self._cache.clear()
+        try:
+            self._prefetch_handle.close()
+        except Exception:
+            pass
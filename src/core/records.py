@@ -0,0 +1,97 @@
+import sys
+
+
+def intern_str(value):
+    """Intern repeated identifiers (VHD names, users, domains) so each is stored once"""
+    return sys.intern(value) if type(value) is str else value
+
+
+class Record:
+    """
+    Base class for parser output rows.
+
+    Fields are stored in __slots__ instead of a per-row dict. Item access
+    (row['time'], row.get('time')) is kept so callers written against the
+    old dict rows keep working.
+    """
+    __slots__ = ()
+    # Fields that repeat across millions of rows and are worth interning
+    interned = ()
+
+    def __init__(self, *args, **kwargs):
+        for name, value in zip(self.__slots__, args):
+            setattr(self, name, value)
+        for name in self.__slots__[len(args):]:
+            setattr(self, name, kwargs.pop(name, None))
+        if kwargs:
+            raise TypeError(f"Unknown fields for {type(self).__name__}: {', '.join(kwargs)}")
+        for name in self.interned:
+            setattr(self, name, intern_str(getattr(self, name)))
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name)
+
+    def __setitem__(self, name, value):
+        setattr(self, name, value)
+
+    def get(self, name, default=None):
+        value = getattr(self, name, None)
+        return default if value is None else value
+
+    def update(self, values=(), **kwargs):
+        for name, value in dict(values, **kwargs).items():
+            setattr(self, name, intern_str(value) if name in self.interned else value)
+
+    def keys(self):
+        return list(self.__slots__)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.as_dict() == other.as_dict()
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class EdgeVisit(Record):
+    """One row of the Edge/Chromium `urls` table"""
+    __slots__ = ('time', 'title', 'url', 'count', 'source', 'folder_name')
+    interned = ('source', 'folder_name')
+
+
+class PrefetchEntry(Record):
+    """One executable from PECmd's CSV output"""
+    __slots__ = ('timestamp', 'name', 'count', 'source')
+    interned = ('name', 'source')
+
+
+class SIDMapping(Record):
+    """SID to user/profile folder attribution on one VHD"""
+    __slots__ = ('time', 'user', 'sid', 'folder_name', 'domain', 'logon_type', 'vhd')
+    interned = ('user', 'sid', 'folder_name', 'domain', 'logon_type', 'vhd')
+
+
+class LogonSession(Record):
+    """One logon interval of a user on a VM"""
+    __slots__ = ('vhd', 'user', 'sid', 'domain', 'logon_id', 'logon_type',
+                 'start', 'end', 'status', 'client', 'reconnects')
+    interned = ('vhd', 'user', 'sid', 'domain', 'logon_type', 'status')
+
+    def covers(self, when):
+        return self.start <= when and (self.end is None or when <= self.end)
+
+    def __repr__(self):
+        return f"LogonSession({self.user}@{self.vhd} {self.start} -> {self.end} [{self.status}])"
@@ -0,0 +1,293 @@
+import os
+import bisect
+from datetime import datetime
+from collections import OrderedDict
+import logging
+import xml.etree.ElementTree as ET
+from Evtx import Evtx as evtx_module
+from src.core.records import LogonSession
+from src.core.exporter import read_rows
+from src.core.metrics import metrics
+
+logger = logging.getLogger("ForensicAnalyzer")
+
+# Security.evtx
+LOGON_EVENTS = {"4624"}
+LOGOFF_EVENTS = {"4634", "4647"}
+RDP_RECONNECT_EVENTS = {"4778"}
+RDP_DISCONNECT_EVENTS = {"4779"}
+
+# TerminalServices-LocalSessionManager/Operational.evtx
+LSM_LOGON_EVENTS = {"21"}
+LSM_LOGOFF_EVENTS = {"23"}
+LSM_DISCONNECT_EVENTS = {"24"}
+LSM_RECONNECT_EVENTS = {"25"}
+
+SESSION_EVENTS = (LOGON_EVENTS | LOGOFF_EVENTS | RDP_RECONNECT_EVENTS | RDP_DISCONNECT_EVENTS
+                  | LSM_LOGON_EVENTS | LSM_LOGOFF_EVENTS | LSM_DISCONNECT_EVENTS | LSM_RECONNECT_EVENTS)
+
+SESSION_FIELDS = list(LogonSession.__slots__)
+
+
+def is_user_account(user_id, user_sid, domain):
+    """Same account filter SIDMapper applies to 4624 events"""
+    if domain == "NT AUTHORITY" or not user_id or user_id.endswith('$'):
+        return False
+    if user_sid is None:
+        return True
+    return user_sid.startswith("S-1-5-21-") or user_sid.startswith("S-1-12-1-")
+
+
+def event_fields(record, event_ids):
+    """(event_id, timestamp, fields) of an EVTX record whose EventID is in event_ids, else None"""
+    try:
+        node = ET.fromstring(record.xml())
+    except Exception:
+        return None
+
+    eid_node = node.find(".//{*}EventID")
+    if eid_node is None or eid_node.text not in event_ids:
+        return None
+
+    fields = {d.get("Name"): d.text for d in node.findall(".//{*}Data")}
+    # LocalSessionManager events keep their fields under UserData/EventXML
+    event_xml = node.find(".//{*}EventXML")
+    if event_xml is not None:
+        for child in event_xml:
+            fields[child.tag.split('}')[-1]] = child.text
+    return eid_node.text, record.timestamp(), fields
+
+
+def iter_events(evtx_path, event_ids):
+    """Yield (event_id, timestamp, fields) for records whose EventID is in event_ids"""
+    records_read = 0
+    try:
+        with evtx_module.Evtx(evtx_path) as log:
+            for record in log.records():
+                records_read += 1
+                event = event_fields(record, event_ids)
+                if event is not None:
+                    yield event
+    finally:
+        metrics.incr('session_evtx_records', records_read)
+
+
+class SessionBuilder:
+    """
+    Pair logon/logoff events by LogonId and emit session intervals per VM.
+
+    Only sessions that are still open are held in memory; the number of open
+    sessions is capped by max_open, and the oldest one is emitted with status
+    'evicted_inferred' when the cap is hit. Its end is inferred from the last
+    event seen for its LogonId, and a later logoff for it is dropped.
+    """
+
+    def __init__(self, max_open=10000):
+        self.max_open = max_open
+        self._open = {}
+        # Last event time per open session, used as the inferred end on eviction
+        self._last_event = {}
+        # Keys of evicted sessions whose logoff may still arrive (bounded like _open)
+        self._evicted = OrderedDict()
+
+    def build(self, evtx_path, vhd_id):
+        """Stream session intervals out of a Security or LocalSessionManager log"""
+        if not os.path.exists(evtx_path):
+            return
+        yield from self.build_events(iter_events(evtx_path, SESSION_EVENTS), vhd_id, evtx_path)
+
+    def build_events(self, events, vhd_id, log_path):
+        """Stream session intervals out of (event_id, timestamp, fields) events of one log"""
+        first_seen = None
+        last_seen = None
+        try:
+            for eid, when, fields in events:
+                # Records are written in order, but clocks can step backwards
+                if first_seen is None or when < first_seen:
+                    first_seen = when
+                if last_seen is None or when > last_seen:
+                    last_seen = when
+
+                if eid in LOGON_EVENTS:
+                    yield from self._on_logon(vhd_id, when, fields)
+                elif eid in LOGOFF_EVENTS:
+                    session = self._on_logoff(vhd_id, when, fields.get("TargetLogonId"), fields, first_seen)
+                    if session:
+                        yield session
+                elif eid in RDP_RECONNECT_EVENTS or eid in RDP_DISCONNECT_EVENTS:
+                    self._on_rdp(vhd_id, eid, when, fields.get("LogonID"), fields)
+                elif eid in LSM_LOGON_EVENTS:
+                    yield from self._on_lsm_logon(vhd_id, when, fields)
+                elif eid in LSM_LOGOFF_EVENTS:
+                    session = self._on_logoff(vhd_id, when, self._lsm_key(fields), fields, first_seen)
+                    if session:
+                        yield session
+                else:
+                    self._on_rdp(vhd_id, eid, when, self._lsm_key(fields), fields)
+        except Exception as e:
+            logger.error(f"Session parsing failed ({log_path}): {e}")
+
+        # Whatever is still open at the end of the log is clamped to the last event
+        for key in [k for k in self._open if k[0] == vhd_id]:
+            session = self._open.pop(key)
+            self._last_event.pop(key, None)
+            session.end = last_seen
+            session.status = "no_logoff"
+            yield session
+
+    def _on_logon(self, vhd_id, when, fields):
+        user_id = fields.get("TargetUserName")
+        user_sid = fields.get("TargetUserSid")
+        domain = fields.get("TargetDomainName")
+        logon_id = fields.get("TargetLogonId")
+        if not logon_id or not is_user_account(user_id, user_sid, domain):
+            return
+
+        yield from self._open_session((vhd_id, logon_id), LogonSession(
+            vhd_id, user_id, user_sid, domain, logon_id, fields.get("LogonType"), when,
+            status="open", client=fields.get("IpAddress"), reconnects=0))
+
+    def _on_lsm_logon(self, vhd_id, when, fields):
+        key = self._lsm_key(fields)
+        account = fields.get("User") or ""
+        domain, _, user_id = account.rpartition('\\')
+        if key is None or not is_user_account(user_id, None, domain):
+            return
+
+        yield from self._open_session((vhd_id, key), LogonSession(
+            vhd_id, user_id, None, domain, key, "10", when,
+            status="open", client=fields.get("Address"), reconnects=0))
+
+    def _open_session(self, key, session):
+        previous = self._open.pop(key, None)
+        if previous is not None:
+            # LogonId reused without a logoff in between: the old session ended here
+            previous.end = session.start
+            previous.status = "no_logoff"
+            yield previous
+
+        self._evicted.pop(key, None)
+        self._open[key] = session
+        self._last_event[key] = session.start
+        if len(self._open) > self.max_open:
+            oldest_key = next(iter(self._open))
+            evicted = self._open.pop(oldest_key)
+            evicted.end = self._last_event.pop(oldest_key, evicted.start)
+            evicted.status = "evicted_inferred"
+            self._evicted[oldest_key] = True
+            if len(self._evicted) > self.max_open:
+                self._evicted.popitem(last=False)
+            yield evicted
+
+    def _on_logoff(self, vhd_id, when, logon_id, fields, first_seen):
+        if not logon_id:
+            return None
+
+        key = (vhd_id, logon_id)
+        session = self._open.pop(key, None)
+        if session is not None:
+            self._last_event.pop(key, None)
+            session.end = when
+            session.status = "complete"
+            return session
+        if self._evicted.pop(key, None):
+            # Already emitted when it was evicted; a second, clamped copy would be wrong
+            return None
+
+        # Logoff of a logon that predates the log: clamp the start to the first event
+        user_id = fields.get("TargetUserName")
+        user_sid = fields.get("TargetUserSid")
+        domain = fields.get("TargetDomainName")
+        if not is_user_account(user_id, user_sid, domain):
+            return None
+        return LogonSession(vhd_id, user_id, user_sid, domain, logon_id,
+                            fields.get("LogonType"), first_seen, end=when, status="no_logon",
+                            reconnects=0)
+
+    def _on_rdp(self, vhd_id, eid, when, logon_id, fields):
+        session = self._open.get((vhd_id, logon_id))
+        if session is None:
+            return
+        self._last_event[(vhd_id, logon_id)] = when
+        if eid in RDP_RECONNECT_EVENTS or eid in LSM_RECONNECT_EVENTS:
+            session.reconnects += 1
+            session.client = fields.get("ClientAddress") or fields.get("Address") or session.client
+
+    @staticmethod
+    def _lsm_key(fields):
+        session_id = fields.get("SessionID")
+        return f"lsm:{session_id}" if session_id else None
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def load_sessions(path):
+    """LogonSession objects back from an exported sessions file (e.g. a sessions stage output)"""
+    for row in read_rows(path):
+        values = {name: row.get(name) or None for name in SESSION_FIELDS}
+        values['start'] = _parse_time(values['start'])
+        values['end'] = _parse_time(values['end'])
+        values['reconnects'] = int(values['reconnects'] or 0)
+        yield LogonSession(**values)
+
+
+class SessionIndex:
+    """Interval index over LogonSession objects for point-in-time lookups per VM"""
+
+    def __init__(self, sessions=()):
+        self._by_vhd = {}
+        self._open_ended = {}
+        self._starts = {}
+        self._max_len = {}
+        for session in sessions:
+            self.add(session)
+
+    def add(self, session):
+        if session.start is None:
+            return
+        if session.end is None:
+            self._open_ended.setdefault(session.vhd, []).append(session)
+        else:
+            self._by_vhd.setdefault(session.vhd, []).append(session)
+            self._starts.pop(session.vhd, None)
+
+    def _prepare(self, vhd_id):
+        if vhd_id in self._starts:
+            return
+        sessions = self._by_vhd.get(vhd_id, [])
+        sessions.sort(key=lambda s: s.start)
+        self._starts[vhd_id] = [s.start for s in sessions]
+        self._max_len[vhd_id] = max((s.end - s.start for s in sessions), default=None)
+
+    def who(self, vhd_id, when):
+        """Sessions on vhd_id that were active at `when`"""
+        self._prepare(vhd_id)
+        sessions = self._by_vhd.get(vhd_id, [])
+        starts = self._starts[vhd_id]
+        max_len = self._max_len[vhd_id]
+
+        hits = [s for s in self._open_ended.get(vhd_id, []) if s.covers(when)]
+        # No closed session is longer than max_len, so the backwards scan can stop early
+        i = bisect.bisect_right(starts, when) - 1
+        while i >= 0 and starts[i] >= when - max_len:
+            if sessions[i].covers(when):
+                hits.append(sessions[i])
+            i -= 1
+        hits.sort(key=lambda s: s.start)
+        return hits
+
+    def sessions(self, vhd_id=None):
+        if vhd_id is not None:
+            self._prepare(vhd_id)
+            merged = self._by_vhd.get(vhd_id, []) + self._open_ended.get(vhd_id, [])
+            return sorted(merged, key=lambda s: s.start)
+        return [s for vhd in self.vhds() for s in self.sessions(vhd)]
+
+    def vhds(self):
+        return sorted(set(self._by_vhd) | set(self._open_ended))
+
+    def __len__(self):
+        return (sum(len(v) for v in self._by_vhd.values())
+                + sum(len(v) for v in self._open_ended.values()))
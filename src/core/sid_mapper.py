@@ -1,57 +1,170 @@
 import os
-import csv
+import json
+import struct
+import logging
 import xml.etree.ElementTree as ET
 from Evtx import Evtx as evtx_module
 from Registry import Registry
+from src.core.exporter import export_rows
+from src.core.records import SIDMapping
+from src.core.timeline_merge import time_key
+from src.core.evtx_watermark import IncrementalReader
+from src.core.metrics import metrics
+
+logger = logging.getLogger("ForensicAnalyzer")
+
+# Part of the hive cache key: bump when a _read_* extraction changes what it returns
+HIVE_PARSER_VERSION = 1
 
 class SIDMapper:
-    def __init__(self):
+    def __init__(self, hive_cache=None):
         self.master_map = []
         self.sid_to_folder = {}
+        self._by_sid = {}
+        self.hive_cache = hive_cache
+        # Saved entries of VMs outside this run: not mapped, but written back by save_state
+        self._retained = []
+
+    def _read_hive(self, hive_path, kind, parse_fn):
+        """Run a hive extraction, going through the content-hash cache when one is set"""
+        with metrics.stage('parse_hive'):
+            if self.hive_cache is None:
+                return parse_fn(hive_path)
+            return self.hive_cache.get_or_parse(hive_path, kind, parse_fn, version=HIVE_PARSER_VERSION)
+
+    @staticmethod
+    def _read_profile_list(software_path):
+        reg = Registry.Registry(software_path)
+        # ProfileList path
+        key_path = r"Microsoft\Windows NT\CurrentVersion\ProfileList"
+        profile_list_key = reg.open(key_path)
+
+        profiles = []
+        for subkey in profile_list_key.subkeys():
+            sid = subkey.name() # The key name is the SID
+            try:
+                profiles.append([sid, subkey.value("ProfileImagePath").value()])
+            except:
+                continue
+        return profiles
+
+    @staticmethod
+    def _read_sam_names(sam_path):
+        reg = Registry.Registry(sam_path)
+        account = reg.open(r"SAM\Domains\Account")
+
+        # The machine SID's three sub-authorities are the last 12 bytes of the V value
+        sub_auths = struct.unpack("<3I", account.value("V").value()[-12:])
+        machine_sid = "S-1-5-21-" + "-".join(str(a) for a in sub_auths)
+
+        names = {}
+        for subkey in account.subkey("Users").subkey("Names").subkeys():
+            # The RID is stored as the type of the default value
+            for value in subkey.values():
+                names[str(value.value_type())] = subkey.name()
+                break
+        return {'machine_sid': machine_sid, 'names': names}
+
+    @staticmethod
+    def _read_ntuser_accounts(ntuser_path):
+        reg = Registry.Registry(ntuser_path)
+        try:
+            key = reg.open(r"Software\Microsoft\IdentityCRL\UserExtendedProperties")
+        except Registry.RegistryKeyNotFoundException:
+            return []
+        return [subkey.name() for subkey in key.subkeys()]
     
-    def parse_software_hive(self, software_path):
-        """Parse SOFTWARE hive to extract SID and user folder mappings"""
+    def parse_software_hive(self, software_path, vhd_id):
+        """Parse SOFTWARE hive to extract SID and user folder mappings for the VM vhd_id"""
         if not os.path.exists(software_path):
             return
 
         try:
-            reg = Registry.Registry(software_path)
-            # ProfileList path
-            key_path = r"Microsoft\Windows NT\CurrentVersion\ProfileList"
-            profile_list_key = reg.open(key_path)
+            profiles = self._read_hive(software_path, 'profile_list', self._read_profile_list)
 
-            for subkey in profile_list_key.subkeys():
-                sid = subkey.name() # The key name is the SID
+            for sid, path_value in profiles:
                 try:
-                    path_value = subkey.value("ProfileImagePath").value()
                     folder_name = os.path.basename(path_value.replace('\\', '/'))
                     self.sid_to_folder[sid] = folder_name
 
                     if folder_name.lower() in ["systemprofile", "localservice", "networkservice"]:
                         continue
 
-                    if not any(item['sid'] == sid for item in self.master_map):
-                        self.master_map.append({
-                        'time': "No Log Found",
-                        'user': "Unknown",
-                        'sid': sid,
-                        'folder_name': folder_name,
-                        'vhd': os.path.basename(os.path.dirname(os.path.dirname(software_path)))
-                    })
+                    if sid not in self._by_sid:
+                        self._add(SIDMapping(
+                            time="No Log Found",
+                            user="Unknown",
+                            sid=sid,
+                            folder_name=folder_name,
+                            vhd=vhd_id
+                        ))
 
-                    print(f"[DEBUG] Mapping added: {sid} -> {folder_name}")
+                    logger.debug(f"Mapping added: {sid} -> {folder_name}")
                 except:
                     continue
         except Exception as e:
-            print(f"Error parsing SOFTWARE hive: {e}")
+            logger.error(f"Error parsing SOFTWARE hive: {e}")
+
+    def parse_sam_hive(self, sam_path):
+        """Name local accounts that have a profile but no logon event, using the SAM hive"""
+        if not os.path.exists(sam_path):
+            return
+
+        try:
+            sam = self._read_hive(sam_path, 'sam_names', self._read_sam_names)
+        except Exception as e:
+            logger.error(f"Error parsing SAM hive: {e}")
+            return
+
+        prefix = sam['machine_sid'] + "-"
+        for entry in self.master_map:
+            if entry.user == "Unknown" and entry.sid.startswith(prefix):
+                name = sam['names'].get(entry.sid[len(prefix):])
+                if name:
+                    entry.update(user=name)
+
+    def parse_ntuser_hive(self, ntuser_path, vhd_id, folder_name=None):
+        """Name vhd_id's profiles from the accounts registered in their NTUSER.DAT"""
+        if not os.path.exists(ntuser_path):
+            return
+
+        try:
+            accounts = self._read_hive(ntuser_path, 'ntuser_accounts', self._read_ntuser_accounts)
+        except Exception as e:
+            logger.error(f"Error parsing NTUSER.DAT: {e}")
+            return
+        if not accounts:
+            return
+
+        if folder_name is None:
+            # Extracted as <workspace>/Users_<folder>/NTUSER.DAT
+            folder_name = os.path.basename(os.path.dirname(ntuser_path))[len("Users_"):]
+        for entry in self.master_map:
+            if entry.user == "Unknown" and entry.vhd == vhd_id and entry.folder_name == folder_name:
+                entry.update(user=accounts[0])
 
-    def parse_evtx_file(self, evtx_path, vhd_id):
+    def parse_evtx_file(self, evtx_path, vhd_id, watermarks=None):
+        """
+        Merge 4624 logons from evtx_path into the map. With a WatermarkStore,
+        only records newer than the stored watermark for this VM/log are read.
+        """
         if not os.path.exists(evtx_path):
             return False
 
+        log_name = os.path.basename(evtx_path)
+        # Counted locally and added once per file; the shared counter takes a lock
+        records_read = 0
         try:
-            with evtx_module.Evtx(evtx_path) as log:
-                for record in log.records():
+            with metrics.stage('parse_evtx'), evtx_module.Evtx(evtx_path) as log:
+                if watermarks is not None:
+                    reader = IncrementalReader(log, os.path.getsize(evtx_path), watermarks.get(vhd_id, log_name))
+                    records = reader.records()
+                else:
+                    reader = None
+                    records = log.records()
+
+                for record in records:
+                    records_read += 1
                     node = ET.fromstring(record.xml())
                     
                     eid_node = node.find(".//{*}EventID")
@@ -59,89 +172,135 @@ class SIDMapper:
                         continue
 
                     event_data = {d.get("Name"): d.text for d in node.findall(".//{*}Data")}
-                    
-                    user_id = event_data.get("TargetUserName")
-                    user_sid = event_data.get("TargetUserSid")
-                    domain = event_data.get("TargetDomainName")
-                    logon_type = event_data.get("LogonType")
+                    self.add_logon(event_data, record.timestamp(), vhd_id)
 
-                    if domain == "NT AUTHORITY" or (user_id and user_id.endswith('$')):
-                        continue
+                if reader is not None:
+                    mark = reader.watermark()
+                    if mark:
+                        watermarks.set(vhd_id, log_name, mark)
+                    metrics.incr('evtx_chunks_skipped', reader.skipped_chunks)
+                    logger.info(f"{vhd_id}/{log_name}: {reader.new_records} new records, "
+                                f"{reader.skipped_chunks} chunks skipped")
+            return True
+        except Exception as e:
+            logger.error(f"Parsing failed: {e}")
+            return False
+        finally:
+            metrics.incr('evtx_records', records_read)
+
+    def add_logon(self, event_data, timestamp, vhd_id):
+        """Merge one 4624 event (its Data fields and record timestamp) into the map"""
+        user_id = event_data.get("TargetUserName")
+        user_sid = event_data.get("TargetUserSid")
+        domain = event_data.get("TargetDomainName")
+        logon_type = event_data.get("LogonType")
+
+        if domain == "NT AUTHORITY" or (user_id and user_id.endswith('$')):
+            return
+        if not (user_id and user_sid):
+            return
+        if not (user_sid.startswith("S-1-5-21-") or user_sid.startswith("S-1-12-1-")):
+            return
 
-                    if user_id and user_sid:
-                        if not (user_sid.startswith("S-1-5-21-") or user_sid.startswith("S-1-12-1-")):
-                            continue
-
-                        event_time = record.timestamp().strftime("%Y-%m-%d %H:%M:%S")
-                        
-                        exists = False
-                        for item in self.master_map:
-                            if item['sid'] == user_sid:
-                                item['time'] = event_time
-                                item['user'] = user_id
-                                item['domain'] = domain
-                                item['logon_type'] = logon_type
-                                exists = True
-                                break
-                        
-                        if not exists:
-                            self.master_map.append({
-                                'time': event_time,
-                                'user': user_id,
-                                'sid': user_sid,
-                                'folder_name': self.sid_to_folder.get(user_sid, "Unknown"), 
-                                'domain': domain if domain else "Unknown",
-                                'logon_type': logon_type if logon_type else "-",
-                                'vhd': vhd_id
-                            })
+        event_time = timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        item = self._by_sid.get(user_sid)
+        if item is not None:
+            item.update(time=event_time, user=user_id, domain=domain, logon_type=logon_type)
+        else:
+            self._add(SIDMapping(
+                time=event_time,
+                user=user_id,
+                sid=user_sid,
+                folder_name=self.sid_to_folder.get(user_sid, "Unknown"),
+                domain=domain if domain else "Unknown",
+                logon_type=logon_type if logon_type else "-",
+                vhd=vhd_id
+            ))
 
+    def save_state(self, state_path):
+        """Persist the map so the next run can merge new events into it"""
+        try:
+            os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+            temp_path = state_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'sid_to_folder': self.sid_to_folder,
+                    'master_map': [entry.as_dict() for entry in self.master_map] + self._retained,
+                }, f)
+            os.replace(temp_path, state_path)
             return True
         except Exception as e:
-            print(f"Parsing failed: {e}")
+            logger.error(f"Mapping state save error: {e}")
+            return False
+
+    def load_state(self, state_path, vhd_ids=None):
+        """Restore a map saved by save_state, only the entries of vhd_ids if given; returns False if there is none"""
+        if not os.path.exists(state_path):
+            return False
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception as e:
+            logger.error(f"Mapping state load error: {e}")
             return False
 
+        self.sid_to_folder.update(state.get('sid_to_folder', {}))
+        for entry in state.get('master_map', []):
+            if vhd_ids is not None and entry.get('vhd') not in vhd_ids:
+                self._retained.append(entry)
+            elif entry['sid'] not in self._by_sid:
+                self._add(SIDMapping(**entry))
+        return True
+
+    def merge_rows(self, rows):
+        """Merge exported mapping rows (e.g. a sid_map stage output); the latest logon per SID wins"""
+        for row in rows:
+            entry = SIDMapping(**{name: row.get(name) for name in SIDMapping.__slots__})
+            current = self._by_sid.get(entry.sid)
+            if current is None:
+                self._add(entry)
+            elif time_key(entry.time) > time_key(current.time):
+                current.update(entry.as_dict())
+
+    def _add(self, entry):
+        self.master_map.append(entry)
+        self._by_sid[entry.sid] = entry
+
     def deduplicate_map(self):
         if not self.master_map:
             return
 
-        self.master_map.sort(key=lambda x: x['time'])
+        self.master_map.sort(key=lambda x: x.time)
 
         unique_data = {}
         for entry in self.master_map:
-            key = (entry['vhd'], entry['sid'], entry['user'])
+            key = (entry.vhd, entry.sid, entry.user)
             
             if key not in unique_data:
                 unique_data[key] = entry
 
         self.master_map = list(unique_data.values())
+        self._by_sid = {entry.sid: entry for entry in self.master_map}
 
     def save_to_csv(self, output_path, deduplicate=True):
         """
         Save results to CSV. Adds the folder_name field to the list.
         """
+        return self.export(output_path, fmt='csv', deduplicate=deduplicate)
+
+    def export(self, output_path, fmt=None, deduplicate=True):
+        """Save results as CSV, JSONL or Parquet (format taken from the extension by default)"""
         if deduplicate:
             self.deduplicate_map()
 
         if not self.master_map:
-            print("No data to save.")
+            logger.warning("No data to save.")
             return False
 
         try:
-            # Create the folder for the output path if it doesn't exist
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-            with open(output_path, 'w', newline='', encoding='utf-8-sig') as f:
-                # Add folder_name to the fieldnames list
-                fieldnames = ['time', 'user', 'sid', 'folder_name', 'domain', 'logon_type', 'vhd']
-                
-                # Adding extrasaction='ignore' prevents errors if some fields are missing in the data
-                writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
-                
-                writer.writeheader()
-                writer.writerows(self.master_map)
-            
-            print(f"CSV saved successfully: {output_path}")
+            export_rows(self.master_map, output_path, 'mapping', fmt=fmt)
+            logger.info(f"Mapping saved successfully: {output_path}")
             return True
         except Exception as e:
-            print(f"CSV save error: {e}")
-            return False
\ No newline at end of file
+            logger.error(f"Mapping save error: {e}")
+            return False
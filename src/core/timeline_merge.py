@@ -0,0 +1,29 @@
+import heapq
+
+
+def time_key(value):
+    """Sort key for timestamp strings; missing or non-date values ('N/A', 'nan') sort oldest"""
+    if not value or not value[0].isdigit():
+        return ""
+    return value
+
+
+def tag_stream(stream, **tags):
+    """Attach fixed fields (e.g. the source VHD) to every row of a parser stream"""
+    for row in stream:
+        row.update(tags)
+        yield row
+
+
+def merge_timelines(streams, key='time', reverse=True):
+    """
+    Lazily merge per-VM streams that are already ordered by `key` into a single
+    ordered stream. Only the head row of each stream is held in memory.
+
+    reverse=True expects (and produces) newest-first order, which is what the
+    parsers emit by default.
+    """
+    if isinstance(key, str):
+        field = key
+        key = lambda row: time_key(row[field])
+    return heapq.merge(*streams, key=key, reverse=reverse)
@@ -3,159 +3,196 @@ import pytsk3
 import pyewf
 import logging
 import pyvhdi
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from src.core.metrics import metrics
+from src.core.readahead import ReadAheadReader
+from src.core.manifest import WorkspaceManifest
 
 logger = logging.getLogger("ForensicAnalyzer")
 
+# Image reads are tallied per handle and added to the shared counter in steps of this size
+READ_METRICS_STEP = 64 * 1024 * 1024
+
 class EWFImgInfo(pytsk3.Img_Info):
-    def __init__(self, ewf_handle):
+    def __init__(self, ewf_handle, prefetch_handle=None):
         self._ewf_handle = ewf_handle
+        # A second handle lets the next chunks decompress in the background during sequential reads
+        self._reader = ReadAheadReader(ewf_handle, ewf_handle.get_media_size(), prefetch_handle) if prefetch_handle else None
+        # Volumes are scanned from several threads; seek+read on the one handle must not interleave
+        self._lock = threading.Lock()
+        self._unreported = 0
         super(EWFImgInfo, self).__init__(url="", type=pytsk3.TSK_IMG_TYPE_EXTERNAL)
+    def close(self):
+        if self._reader:
+            self._reader.close()
+        self._ewf_handle.close()
+        metrics.incr('image_bytes_read', self._unreported)
+        self._unreported = 0
     def read(self, offset, size):
-        self._ewf_handle.seek(offset)
-        return self._ewf_handle.read(size)
+        with self._lock:
+            if self._reader:
+                data = self._reader.read(offset, size)
+            else:
+                self._ewf_handle.seek(offset)
+                data = self._ewf_handle.read(size)
+            self._unreported += len(data)
+            if self._unreported >= READ_METRICS_STEP:
+                metrics.incr('image_bytes_read', self._unreported)
+                self._unreported = 0
+        return data
     def get_size(self):
         return self._ewf_handle.get_media_size()
     
 class VHDImgInfo(pytsk3.Img_Info):
     def __init__(self, vhd_handle):
         self._vhd_handle = vhd_handle
+        self._lock = threading.Lock()
+        self._unreported = 0
         super(VHDImgInfo, self).__init__(url="", type=pytsk3.TSK_IMG_TYPE_EXTERNAL)
     
     def close(self):
         self._vhd_handle.close()
+        metrics.incr('image_bytes_read', self._unreported)
+        self._unreported = 0
     
     def read(self, offset, size):
-        self._vhd_handle.seek(offset)
-        return self._vhd_handle.read(size)
+        with self._lock:
+            self._vhd_handle.seek(offset)
+            data = self._vhd_handle.read(size)
+            self._unreported += len(data)
+            if self._unreported >= READ_METRICS_STEP:
+                metrics.incr('image_bytes_read', self._unreported)
+                self._unreported = 0
+        return data
     
     def get_size(self):
         return self._vhd_handle.get_media_size()
 
+# Root folder names that mark an OS volume, with their weight when ranking volumes
+OS_INDICATORS = {'windows': 4, 'users': 2, 'program files': 1, 'program files (x86)': 1, 'programdata': 1}
+
+
+class Volume:
+    """
+    One filesystem found in the image. The primary volume extracts into the
+    image workspace; every other volume gets its own subfolder (`name`).
+    """
+
+    def __init__(self, fs_info, offset, size, description, workspace):
+        self.fs_info = fs_info
+        self.offset = offset
+        self.size = size
+        self.description = description
+        self.workspace = workspace
+        self.name = None
+        self.score = self._os_score()
+
+    def _os_score(self):
+        try:
+            names = {entry.info.name.name.decode('utf-8', 'replace').lower()
+                     for entry in self.fs_info.open_dir(path="/") if hasattr(entry.info, 'name')}
+        except Exception:
+            return 0
+        logger.debug(f"  -> Root directory at offset {self.offset}: {sorted(names - {'.', '..'})}")
+        return sum(weight for name, weight in OS_INDICATORS.items() if name in names)
+
+
 class EvidenceManager:
-    def __init__(self, image_path, workspace_base="workspace"):
+    def __init__(self, image_path, workspace_base="workspace", readahead=True, volume_workers=4):
         self.image_path = os.path.abspath(image_path)
+        self.readahead = readahead
+        self.volume_workers = volume_workers
         self.extension = os.path.splitext(self.image_path)[1].lower()
         self.workspace = os.path.abspath(os.path.join(workspace_base, os.path.basename(image_path).replace(".", "_")))
         os.makedirs(self.workspace, exist_ok=True)
+        self.manifest = WorkspaceManifest(self.workspace)
         
         self.img_info = self._init_image_handle()
+        # Every filesystem in the image, primary (most OS-like) first; fs_info is the primary's
+        self.volumes = []
         self.fs_info = None
+        # Called with the number of bytes written after every chunk _save_entry copies
+        self.progress_callback = None
 
-        if self.img_info:
+        with metrics.stage('probe'):
+            self._probe_filesystem()
+
+    def _probe_filesystem(self):
+        if not self.img_info:
+            return
+        try:
+            logger.debug(f"Analyzing partitions...")
+            logger.debug(f"Total image size: {self.img_info.get_size()} bytes")
+            self.volumes = self._partition_volumes() or self._unpartitioned_volume()
+            # Primary first: most OS indicators, then the largest volume
+            self.volumes.sort(key=lambda volume: (volume.score, volume.size), reverse=True)
+            for volume in self.volumes[1:]:
+                volume.name = f"volume_{volume.offset}"
+                volume.workspace = os.path.join(self.workspace, volume.name)
+
+            if self.volumes:
+                self.fs_info = self.volumes[0].fs_info
+                for volume in self.volumes:
+                    logger.info(f"Filesystem found at offset: {volume.offset} ({volume.description}, "
+                                f"OS score {volume.score}{', primary' if volume.fs_info is self.fs_info else ''})")
+            else:
+                logger.error(f"Could not find valid filesystem in VHD")
+
+        except Exception as e:
+            logger.error(f"Exception during partition analysis: {e}")
+            logger.debug(traceback.format_exc())
+
+    def _partition_volumes(self):
+        """Every partition in the volume table that holds a filesystem TSK can open"""
+        volumes = []
+        try:
+            volume_info = pytsk3.Volume_Info(self.img_info)
+        except Exception as vol_err:
+            logger.debug(f"Volume_Info failed: {vol_err}")
+            return volumes
+
+        for partition in volume_info:
+            description = partition.desc.decode('utf-8', 'replace')
+            logger.debug(f"Partition {partition.addr}: start {partition.start}, {partition.len} sectors, "
+                         f"{description}, flags {partition.flags}")
+            # 너무 작은 파티션 스킵
+            if partition.len < 2048:
+                continue
+            offset = partition.start * 512
             try:
-                print(f"[DEBUG] Analyzing partitions...")
-                print(f"[DEBUG] Total image size: {self.img_info.get_size()} bytes")
-                
-                # 먼저 Volume (파티션 테이블) 읽기 시도
-                try:
-                    volume = pytsk3.Volume_Info(self.img_info)
-                    partition_count = 0
-                    
-                    for partition in volume:
-                        partition_count += 1
-                        print(f"[DEBUG] Partition {partition_count}:")
-                        print(f"  - Start: {partition.start} (bytes: {partition.start * 512})")
-                        print(f"  - Length: {partition.len} sectors")
-                        print(f"  - Description: {partition.desc.decode('utf-8', 'replace')}")
-                        print(f"  - Flags: {partition.flags}")
-                        
-                        # 너무 작은 파티션 스킵
-                        if partition.len < 2048:
-                            print(f"  -> Skipping (too small)")
-                            continue
-
-                        offset = partition.start * 512
-                        
-                        try:
-                            temp_fs = pytsk3.FS_Info(self.img_info, offset=offset)
-                            print(f"  -> FS_Info created successfully")
-                            
-                            # Windows 디렉토리 확인
-                            try:
-                                temp_fs = pytsk3.FS_Info(self.img_info, offset=offset)
-                                print(f"  -> FS_Info created successfully")
-                                
-                                # 파일시스템이 열리면 일단 사용 (Windows 디렉토리 체크 제거)
-                                if not self.fs_info:
-                                    self.fs_info = temp_fs
-                                    print(f"[SUCCESS] Filesystem found at offset: {offset}")
-                                    
-                                    # 디렉토리 내용 확인 (디버그용)
-                                    try:
-                                        root_dir = temp_fs.open_dir(path="/")
-                                        print(f"  -> Root directory contents:")
-                                        for entry in root_dir:
-                                            if not hasattr(entry, 'info') or not hasattr(entry.info, 'name'):
-                                                continue
-                                            name = entry.info.name.name.decode('utf-8', 'replace')
-                                            if name not in ['.', '..']:
-                                                print(f"     - {name}")
-                                    except Exception as e:
-                                        print(f"  -> Could not list directory: {e}")
-                                    
-                                    break  # 첫 번째 유효한 파일시스템을 찾으면 종료
-                                    
-                            except Exception as e:
-                                print(f"  -> Failed to create FS_Info: {e}")
-                                continue
-                                
-                        except Exception as e:
-                            print(f"  -> Failed to create FS_Info: {e}")
-                            continue
-                    
-                    if partition_count == 0:
-                        print(f"[DEBUG] No partitions found in volume table")
-                        raise Exception("No partitions")
-                        
-                except Exception as vol_err:
-                    print(f"[DEBUG] Volume_Info failed: {vol_err}")
-                    print(f"[DEBUG] Trying common offsets for VHD without partition table...")
-                    
-                    # VHD가 파티션 테이블 없이 직접 파일시스템일 수 있음
-                    common_offsets = [
-                        0,           # 파티션 테이블 없음
-                        512,         # 1 섹터
-                        1024,        # 2 섹터
-                        2048,        # 4 섹터
-                        32256,       # 63 섹터 (레거시 DOS)
-                        1048576,     # 2048 섹터 (1MB, 현대적 정렬)
-                    ]
-                    
-                    for offset in common_offsets:
-                        print(f"[DEBUG] Trying offset: {offset} bytes ({offset//512} sectors)")
-                        try:
-                            temp_fs = pytsk3.FS_Info(self.img_info, offset=offset)
-                            
-                            # 루트 디렉토리 접근 시도
-                            root_dir = temp_fs.open_dir(path="/")
-                            found_os = False
-                            
-                            for entry in root_dir:
-                                name = entry.info.name.name.decode('utf-8', 'replace')
-                                print(f"  Found: {name}")
-                                if name.lower() in ["windows", "users", "program files"]:
-                                    found_os = True
-                                    print(f"  -> Found OS indicator: {name}")
-                            
-                            if found_os:
-                                self.fs_info = temp_fs
-                                print(f"[SUCCESS] Filesystem found at offset: {offset}")
-                                break
-                            else:
-                                print(f"  -> No OS directories found at this offset")
-                                
-                        except Exception as e:
-                            print(f"  -> Failed: {str(e)[:100]}")
-                            continue
-                
-                if not self.fs_info:
-                    print(f"[ERROR] Could not find valid filesystem in VHD")
-                    
+                fs_info = pytsk3.FS_Info(self.img_info, offset=offset)
             except Exception as e:
-                print(f"[ERROR] Exception during partition analysis: {e}")
-                print(traceback.format_exc())
+                logger.debug(f"  -> Failed to create FS_Info: {e}")
+                continue
+            volumes.append(Volume(fs_info, offset, partition.len * 512, description, self.workspace))
+        return volumes
+
+    def _unpartitioned_volume(self):
+        """VHD가 파티션 테이블 없이 직접 파일시스템일 수 있음"""
+        logger.debug(f"Trying common offsets for VHD without partition table...")
+        common_offsets = [
+            0,           # 파티션 테이블 없음
+            512,         # 1 섹터
+            1024,        # 2 섹터
+            2048,        # 4 섹터
+            32256,       # 63 섹터 (레거시 DOS)
+            1048576,     # 2048 섹터 (1MB, 현대적 정렬)
+        ]
+        for offset in common_offsets:
+            logger.debug(f"Trying offset: {offset} bytes ({offset//512} sectors)")
+            try:
+                volume = Volume(pytsk3.FS_Info(self.img_info, offset=offset), offset,
+                                self.img_info.get_size() - offset, "No partition table", self.workspace)
+            except Exception as e:
+                logger.debug(f"  -> Failed: {str(e)[:100]}")
+                continue
+            if volume.score:
+                return [volume]
+            logger.debug(f"  -> No OS directories found at this offset")
+        return []
 
     def _init_image_handle(self):
         try:
@@ -163,21 +200,33 @@ class EvidenceManager:
                 filenames = pyewf.glob(self.image_path)
                 handle = pyewf.handle()
                 handle.open(filenames)
-                return EWFImgInfo(handle)
+                prefetch_handle = None
+                if self.readahead:
+                    prefetch_handle = pyewf.handle()
+                    prefetch_handle.open(filenames)
+                return EWFImgInfo(handle, prefetch_handle)
             elif self.extension in ['.vhd', '.vhdx']:
                 handle = pyvhdi.file()
                 handle.open(self.image_path)
-                print(f"[DEBUG] VHD opened: {self.image_path}")
-                print(f"[DEBUG] VHD media size: {handle.get_media_size()}")
+                logger.debug(f"VHD opened: {self.image_path}")
+                logger.debug(f"VHD media size: {handle.get_media_size()}")
                 return VHDImgInfo(handle)
             else:
                 return pytsk3.Img_Info(self.image_path)
         except Exception as e:
-            print(f"[ERROR] Image initialization failed: {e}")
-            print(traceback.format_exc())
             logger.error(f"Image initialization failed: {e}")
+            logger.debug(traceback.format_exc())
             return None
 
+    def close(self):
+        """Release the image handles (and any read-ahead cache); the workspace stays usable"""
+        self.manifest.close()
+        self.volumes = []
+        self.fs_info = None
+        if self.img_info:
+            self.img_info.close()
+            self.img_info = None
+
     def _get_user_list(self):
         users = []
         if not self.fs_info: return users
@@ -194,42 +243,56 @@ class EvidenceManager:
 
     def extract_single_target(self, target_path):
         """Directly scan the Users folder to create and extract individual user paths"""
+        with metrics.stage('extract'):
+            try:
+                if len(self.volumes) <= 1:
+                    return self._extract_target(target_path, self.volumes[0] if self.volumes else None)
+                return self._extract_volumes(target_path)
+            finally:
+                self.manifest.flush()
+
+    def _extract_volumes(self, target_path):
+        """Extract from every volume at once, each through its own FS_Info on the shared image handle"""
+        with ThreadPoolExecutor(max_workers=min(len(self.volumes), self.volume_workers),
+                                thread_name_prefix="volume-scan") as pool:
+            futures = [pool.submit(self._extract_target, target_path, volume) for volume in self.volumes]
+            primary = futures[0].result()
+            # Other volumes only report what they actually had
+            for volume, future in zip(self.volumes[1:], futures[1:]):
+                primary.extend(dict(res, path=f"{volume.name}/{res['path']}") for res in future.result() if res['success'])
+        return primary
+
+    def _extract_target(self, target_path, volume):
         clean_path = target_path.replace('\\', '/').lstrip('/')
         detailed_results = []
 
         # Windows 디렉토리 체크 제거 - 모든 경로 시도
-        if not self.fs_info:
-            print(f"[WARNING] No filesystem available")
+        if volume is None:
+            logger.warning(f"No filesystem available")
             return [{'path': target_path, 'success': False, 'message': 'No filesystem loaded'}]
 
         # 1. Handle cases where the pattern 'Users/*' is included
         if 'Users/*' in target_path:
             base_after_user = clean_path.split('Users/*/')[-1]
             try:
-                users_dir = self.fs_info.open_dir(path="/Users")
-                for entry in users_dir:
-                    if not hasattr(entry.info, 'name'): 
-                        continue
-                    name = entry.info.name.name.decode('utf-8', 'replace')
-                    if name in ['.', '..'] or entry.info.meta is None: 
-                        continue
-                    
+                for name in self._user_folder_names(volume):
                     user_path = f"Users/{name}/{base_after_user}"
-                    success = self._try_extract(user_path)
+                    success = self._try_extract(user_path, volume)
                     detailed_results.append({
                         'path': user_path,
                         'success': success,
                         'message': "Success" if success else "Not Found"
                     })
             except Exception as e:
-                print(f"[ERROR] Failed to scan Users folder: {e}")
+                # Volumes without a Users folder (EFI, recovery) are expected next to the OS volume
+                (logger.error if volume.name is None else logger.debug)(f"Failed to scan Users folder: {e}")
                 detailed_results.append({
                     'path': target_path,
                     'success': False,
                     'message': f"Users folder not accessible: {str(e)}"
                 })
         else:
-            success = self._try_extract(clean_path)
+            success = self._try_extract(clean_path, volume)
             detailed_results.append({
                 'path': clean_path,
                 'success': success,
@@ -238,23 +301,74 @@ class EvidenceManager:
 
         return detailed_results
 
-    def _try_extract(self, path):
+    def _user_folder_names(self, volume):
+        users_dir = volume.fs_info.open_dir(path="/Users")
+        for entry in users_dir:
+            if not hasattr(entry.info, 'name'):
+                continue
+            name = entry.info.name.name.decode('utf-8', 'replace')
+            if name in ['.', '..'] or entry.info.meta is None:
+                continue
+            yield name
+
+    def measure_target(self, target_path):
+        """Bytes extract_single_target(target_path) will write, from filesystem metadata alone"""
+        return sum(self._measure_volume(target_path, volume) for volume in self.volumes)
+
+    def _measure_volume(self, target_path, volume):
+        clean_path = target_path.replace('\\', '/').lstrip('/')
+        if 'Users/*' in target_path:
+            base_after_user = clean_path.split('Users/*/')[-1]
+            try:
+                paths = [f"Users/{name}/{base_after_user}" for name in self._user_folder_names(volume)]
+            except Exception:
+                return 0
+        else:
+            paths = [clean_path]
+
+        total = 0
+        for path in paths:
+            try:
+                entry = volume.fs_info.open('/' + path)
+                if entry.info.meta.type == pytsk3.TSK_FS_META_TYPE_REG:
+                    total += entry.info.meta.size
+                elif entry.info.meta.type == pytsk3.TSK_FS_META_TYPE_DIR:
+                    total += self._measure_dir(entry.as_directory())
+            except Exception:
+                continue
+        return total
+
+    def _measure_dir(self, directory):
+        """Same walk as _extract_dir, summing file sizes instead of copying"""
+        total = 0
+        for entry in directory:
+            name = entry.info.name.name.decode('utf-8', 'replace')
+            if name in [".", ".."] or name.startswith('$'): continue
+            try:
+                if entry.info.meta.type == pytsk3.TSK_FS_META_TYPE_REG:
+                    total += entry.info.meta.size
+                elif entry.info.meta.type == pytsk3.TSK_FS_META_TYPE_DIR:
+                    total += self._measure_dir(entry.as_directory())
+            except: continue
+        return total
+
+    def _try_extract(self, path, volume):
         """Attempt to extract a file or folder from the specified path"""
         clean_path = '/' + path.replace('\\', '/').lstrip('/')
-        print(f"[DEBUG] Extraction attempt path: {clean_path}")
+        logger.debug("Extraction attempt path: %s", clean_path)
         try:
             # Check what is at the specified path in the filesystem (file, folder, or non-existent)
-            entry = self.fs_info.open(clean_path)
+            entry = volume.fs_info.open(clean_path)
             # Regular file case
             if entry.info.meta.type == pytsk3.TSK_FS_META_TYPE_REG:
-                return self._save_entry(entry, clean_path)
+                return self._save_entry(entry, clean_path, volume)
             # Directory case
             elif entry.info.meta.type == pytsk3.TSK_FS_META_TYPE_DIR:
-                self._extract_dir(entry.as_directory(), clean_path)
+                self._extract_dir(entry.as_directory(), clean_path, volume)
                 return True
         except: return False
 
-    def _extract_dir(self, directory, current_path):
+    def _extract_dir(self, directory, current_path, volume):
         """Recursively extract all items within a directory"""
         for entry in directory:
             name = entry.info.name.name.decode('utf-8', 'replace')
@@ -262,12 +376,12 @@ class EvidenceManager:
             this_path = f"{current_path}/{name}"
             try:
                 if entry.info.meta.type == pytsk3.TSK_FS_META_TYPE_REG:
-                    self._save_entry(entry, this_path)
+                    self._save_entry(entry, this_path, volume)
                 elif entry.info.meta.type == pytsk3.TSK_FS_META_TYPE_DIR:
-                    self._extract_dir(entry.as_directory(), this_path)
+                    self._extract_dir(entry.as_directory(), this_path, volume)
             except: continue
 
-    def _save_entry(self, entry, full_path):
+    def _save_entry(self, entry, full_path, volume):
         """Save a filesystem entry to the dedicated artifact folder within the workspace"""
         try:
             # 1. Extract and clean the parent folder path
@@ -275,7 +389,7 @@ class EvidenceManager:
             dir_name = os.path.dirname(full_path).replace('\\', '/').strip('/')
             rel_dir = dir_name.replace('/', '_')
             
-            target_dir = os.path.join(self.workspace, rel_dir)
+            target_dir = os.path.join(volume.workspace, rel_dir)
 
             # 2. Create the folder
             if not os.path.exists(target_dir):
@@ -284,6 +398,11 @@ class EvidenceManager:
             # 3. Save the file
             file_name = os.path.basename(full_path)
             save_path = os.path.join(target_dir, file_name)
+            # Different image paths can flatten to the same folder name; keep both, the manifest says which is which
+            suffix = 0
+            while not self.manifest.claim_path(save_path, full_path, volume.name or ""):
+                suffix += 1
+                save_path = os.path.join(target_dir, f"{file_name}~{suffix}")
 
             with open(save_path, "wb") as f:
                 offset = 0
@@ -292,7 +411,13 @@ class EvidenceManager:
                     chunk = min(1024 * 1024, size - offset)
                     f.write(entry.read_random(offset, chunk))
                     offset += chunk
+                    if self.progress_callback:
+                        self.progress_callback(chunk)
+            self.manifest.record(full_path, save_path, size, volume=volume.name or "")
+            metrics.incr('files_extracted')
+            metrics.incr('bytes_written', size)
             return True
         except Exception as e:
+            metrics.incr('files_failed')
             logger.error(f"Save failed ({full_path}): {e}")
             return False
\ No newline at end of file
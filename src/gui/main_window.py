@@ -1,5 +1,7 @@
 import sys
 import os
+import time
+import logging
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QTableWidget, QTableWidgetItem,
     QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QLabel,
@@ -13,80 +15,304 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from src.core.vhd_manager import EvidenceManager 
 from src.core.sid_mapper import SIDMapper
+from src.core.hive_cache import HiveCache
+from src.core.evtx_watermark import WatermarkStore
+from src.core.session_builder import SessionBuilder, load_sessions
+from src.core.timeline_merge import merge_timelines, tag_stream
+from src.core.exporter import ChunkedExporter, EXPORT_FIELDS, available_formats, export_rows, read_rows, safe_filename
+from src.core.metrics import metrics, profiling, setup_logging
+from src.core.progress import ProgressTracker
+from src.core.job_queue import JobQueue, PermanentError, DONE, DEAD, image_identity
+from src.core.manifest import WorkspaceManifest
+from src.core.pipeline import StageScheduler, stage_output
+from src.core.memory import SpillBuffer, budget
 from src.parser.prefetch_parser import PrefetchParser
 from src.parser.edge_history_parser import EdgeHistoryParser
 
+logger = logging.getLogger("ForensicAnalyzer")
+
+# Timeline tables show the newest rows only; the exported file always has all of them
+MAX_TABLE_ROWS = int(os.environ.get("VDI_MAX_TABLE_ROWS", "20000"))
+
 class AnalysisThread(QThread):
     progress = pyqtSignal(str)
     vhd_done = pyqtSignal(int)
     item_processed = pyqtSignal(dict) 
     finished = pyqtSignal(list)
 
-    def __init__(self, vhd_paths, selected_artifacts):
+    def __init__(self, vhd_paths, selected_artifacts, export_format="csv"):
         super().__init__()
         self.vhd_paths = vhd_paths
         self.selected_artifacts = selected_artifacts
+        self.export_format = export_format
 
     def run(self):
+        metrics.reset()
+        with profiling("analysis"):
+            self._run()
+        metrics.log_summary()
+        metrics.write_report(os.path.join("workspace", "run_report_analysis.json"))
+
+    def _run(self):
         results = []
-        total_steps = len(self.vhd_paths) * len(self.selected_artifacts)
-        current_step = 0
 
-        for i, path in enumerate(self.vhd_paths):
-            vhd_name = os.path.basename(path)
-            manager = EvidenceManager(path)
-            
-            for art_path in self.selected_artifacts:
-                current_step += 1
-                self.progress.emit(f"분석 중: {vhd_name} -> {art_path}")
-                detailed_results = manager.extract_single_target(art_path)
-                
+        status_path = os.path.join("workspace", f"extraction_status.{self.export_format}")
+        status_log = ChunkedExporter(status_path, EXPORT_FIELDS['extraction'], fmt=self.export_format, chunk_size=500)
+
+        # One durable task per (image, artifact): a restarted run only does what is left
+        queue = JobQueue(os.path.join("workspace", "jobs.db"))
+        # Only images with extraction left hold open handles (and read-ahead memory)
+        managers = {}
+        try:
+            queue.recover()
+            images = {os.path.abspath(path): path for path in self.vhd_paths}
+            queue.reset(images=images)
+            # Evidence re-collected to the same path is extracted (and parsed) again
+            identities = {image: image_identity(image) for image in images}
+            for image in images:
+                for art_path in self.selected_artifacts:
+                    queue.add(image, art_path, "extract", image_id=identities[image])
+
+            # Parse stages start in worker processes as soon as their inputs are extracted
+            scheduler = StageScheduler(self.selected_artifacts, "workspace", self.export_format)
+            for image in images:
+                for spec in scheduler.specs:
+                    queue.add(image, "", spec.stage, image_id=identities[image])
+
+            # Size every remaining target from filesystem metadata so progress is weighted by bytes
+            workspaces = {}
+            sizes = {}
+            for image, path in images.items():
+                vhd_name = os.path.basename(path)
+                self.progress.emit(f"Sizing: {vhd_name}")
+                manager = EvidenceManager(path)
+                workspaces[image] = manager.workspace
+                sizes[vhd_name] = 0
+                for art_path in self.selected_artifacts:
+                    task = queue.get(image, art_path, "extract")
+                    if task['status'] == DONE:
+                        for res in queue.result(task):
+                            self._report(status_log, vhd_name, res, resumed=True)
+                        self._schedule(scheduler, queue, image, art_path)
+                    else:
+                        sizes[vhd_name] += manager.measure_target(art_path)
+                if set(queue.counts("extract", [image], self.selected_artifacts)) <= {DONE, DEAD}:
+                    manager.close()
+                else:
+                    # Extraction reuses the probed volumes instead of opening and probing the image again
+                    managers[image] = manager
+            tracker = ProgressTracker(sizes)
+            self._last_report = 0.0
+
+            total_steps = sum(n for status, n in queue.counts("extract", images, self.selected_artifacts).items() if status != DONE)
+            current_step = 0
+            while True:
+                task = queue.claim("extract", images, self.selected_artifacts)
+                if task is None:
+                    wait = queue.next_retry_in("extract", images, self.selected_artifacts)
+                    if wait is None:
+                        break
+                    self.progress.emit(f"Retrying failed extractions in {wait:.0f}s")
+                    time.sleep(wait)
+                    continue
+
+                image = task['image']
+                vhd_name = os.path.basename(image)
+                manager = managers.get(image)
+                if manager is None or task['attempts']:
+                    # Retry against a fresh handle in case the image or its storage was the problem
+                    if manager is not None:
+                        manager.close()
+                    manager = managers[image] = EvidenceManager(images[image])
+                tracker.start(vhd_name)
+                manager.progress_callback = lambda nbytes, name=vhd_name: self._on_bytes(tracker, name, nbytes)
+                self.progress.emit(f"분석 중: {vhd_name} -> {task['artifact']}")
+
+                try:
+                    if manager.fs_info is None:
+                        raise PermanentError("No filesystem loaded")
+                    detailed_results = manager.extract_single_target(task['artifact'])
+                except Exception as e:
+                    permanent = isinstance(e, PermanentError)
+                    if queue.fail(task, e, permanent=permanent) == DEAD:
+                        message = str(e) if permanent else f"Gave up after {queue.max_attempts} attempts: {e}"
+                        self._report(status_log, vhd_name, {'path': task['artifact'], 'success': False, 'message': message})
+                        current_step += 1
+                        self._release_settled(queue, managers, tracker, image)
+                    continue
+
+                queue.complete(task, detailed_results)
                 for res in detailed_results:
-                    self.item_processed.emit({
-                        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        'artifact': res['path'], # 구체적인 유저 경로
-                        'status': "Success" if res['success'] else "Failed",
-                        'message': res['message'],
-                        'source': vhd_name
-                    })
-
-                percent = int((current_step / total_steps) * 100)
+                    self._report(status_log, vhd_name, res)
+                self._release_settled(queue, managers, tracker, image)
+                self._schedule(scheduler, queue, image, task['artifact'])
+                for stage_result in scheduler.results():
+                    self._report_stage(status_log, scheduler, queue, stage_result)
+
+                current_step += 1
+                overall = tracker.overall_status()
+                percent = overall['percent'] if overall['total'] else int((current_step / max(total_steps, 1)) * 100)
                 self.vhd_done.emit(percent)
-                
-            results.append({'vhd_id': vhd_name, 'workspace': manager.workspace})
 
+            while scheduler.pending():
+                self.progress.emit(f"Parsing: {scheduler.pending()} stage(s) still running")
+                for stage_result in scheduler.results(block=True):
+                    self._report_stage(status_log, scheduler, queue, stage_result)
+            scheduler.shutdown()
+
+            for image, workspace in workspaces.items():
+                results.append({'vhd_id': os.path.basename(image), 'workspace': workspace})
+
+            logger.info(f"Job queue: {queue.counts('extract', images, self.selected_artifacts)}")
+            logger.info(f"Memory budget: {budget.status()}")
+        finally:
+            for manager in managers.values():
+                manager.close()
+            queue.close()
+            status_log.close()
+        self.vhd_done.emit(100)
         self.finished.emit(results)
 
+    def _report(self, status_log, vhd_name, res, resumed=False):
+        item = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'artifact': res['path'], # 구체적인 유저 경로
+            'status': "Success" if res['success'] else "Failed",
+            'message': res['message'] + (" (previous run)" if resumed else ""),
+            'source': vhd_name
+        }
+        status_log.write(item)
+        self.item_processed.emit(item)
+
+    def _release_settled(self, queue, managers, tracker, image):
+        """Close an image, and stop its throughput clock, once none of its extract tasks can run again"""
+        if set(queue.counts("extract", [image], self.selected_artifacts)) <= {DONE, DEAD}:
+            managers.pop(image).close()
+            vhd_name = os.path.basename(image)
+            tracker.finish(vhd_name)
+            logger.info(f"{vhd_name}: {ProgressTracker.describe(tracker.image_status(vhd_name))}")
+
+    def _schedule(self, scheduler, queue, image, art_path):
+        done = [spec.stage for spec in scheduler.specs if queue.is_done(image, "", spec.stage)]
+        for stage in scheduler.extracted(image, art_path, skip_stages=done):
+            logger.info(f"{os.path.basename(image)}: parse stage '{stage}' submitted")
+
+    def _report_stage(self, status_log, scheduler, queue, stage_result):
+        task = queue.get(stage_result['image'], "", stage_result['stage'])
+        res = {'path': f"{scheduler.spec(stage_result['stage']).name} (parsed)", 'success': stage_result['ok']}
+        if stage_result['ok']:
+            queue.complete(task, stage_result['data'])
+            data = stage_result['data']
+            res['message'] = f"{data['rows']} rows -> {data['output']} ({stage_result['elapsed_s']:.1f}s)"
+        else:
+            # Not retried within this run; the next run picks the stage up again
+            queue.fail(task, stage_result['error'], permanent=stage_result.get('permanent', False))
+            res['message'] = stage_result['error']
+        self._report(status_log, os.path.basename(stage_result['image']), res)
+
+    def _on_bytes(self, tracker, vhd_name, nbytes):
+        tracker.advance(vhd_name, nbytes)
+        # Signals cross into the GUI thread; a few updates per second is plenty
+        now = time.perf_counter()
+        if now - self._last_report < 0.25:
+            return
+        self._last_report = now
+        overall = tracker.overall_status()
+        self.progress.emit(f"{vhd_name}: {ProgressTracker.describe(tracker.image_status(vhd_name))} | "
+                           f"Total: {ProgressTracker.describe(overall)}")
+        self.vhd_done.emit(overall['percent'])
+
 class MappingThread(QThread):
     progress = pyqtSignal(str)
     mapping_done = pyqtSignal(list)
+    sessions_done = pyqtSignal(object)
     finished = pyqtSignal()
 
-    def __init__(self, vhd_info_list):
+    def __init__(self, vhd_info_list, export_format="csv"):
         super().__init__()
         self.vhd_info_list = vhd_info_list
+        self.export_format = export_format
 
     def run(self):
-        mapper = SIDMapper()
-        
+        metrics.reset()
+        with profiling("mapping"):
+            self._run()
+        metrics.log_summary()
+        metrics.write_report(os.path.join("workspace", "run_report_mapping.json"))
+
+    def _run(self):
+        hive_cache = HiveCache(os.path.join("workspace", "hive_cache.json"))
+        mapper = SIDMapper(hive_cache=hive_cache)
+
+        # Resume from the previous run: keep its map and only read newer EVTX records
+        state_path = os.path.join("workspace", "sid_map_state.json")
+        watermarks = WatermarkStore(os.path.join("workspace", "evtx_watermarks.json"))
+        # Only this run's VMs go into the map; the others are kept in the state file for later runs
+        if not mapper.load_state(state_path, vhd_ids={info['vhd_id'] for info in self.vhd_info_list}):
+            watermarks.clear()
+
+        session_builder = SessionBuilder()
+        # Sorted per VM by start for the export; spills to disk past its share of the memory budget
+        sessions_sorted = SpillBuffer(key=lambda session: (session.vhd, session.start), reverse=False)
+
         for info in self.vhd_info_list:
             vhd_id = info['vhd_id']
-            workspace = info['workspace']
-            
-            soft_dir = os.path.join(workspace, "Windows_System32_config")
-            soft_path = os.path.join(soft_dir, "SOFTWARE")
-            if os.path.exists(soft_path):
-                mapper.parse_software_hive(soft_path)
-
-            evtx_dir = os.path.join(workspace, "Windows_System32_winevt_Logs")
-            evtx_path = os.path.join(evtx_dir, "Security.evtx")
-            if os.path.exists(evtx_path):
-                mapper.parse_evtx_file(evtx_path, vhd_id)
-
-        csv_path = os.path.join("workspace", "integrated_sid_map.csv")
-        mapper.save_to_csv(csv_path)
+            # Images the analysis run already mapped are read back instead of parsed again
+            mapped = stage_output(info['workspace'], 'sid_map')
+            if mapped:
+                self.progress.emit(f"Loading SID map: {vhd_id}")
+                mapper.merge_rows(read_rows(mapped))
+            sessions = stage_output(info['workspace'], 'sessions')
+            if sessions:
+                self.progress.emit(f"Loading logon sessions: {vhd_id}")
+                sessions_sorted.extend(session for session in load_sessions(sessions) if session.start)
+            if mapped and sessions:
+                continue
+
+            with WorkspaceManifest(info['workspace']) as manifest:
+                if not mapped:
+                    soft_path = manifest.find('software_hive')
+                    if soft_path:
+                        mapper.parse_software_hive(soft_path, vhd_id)
+
+                    evtx_path = manifest.find('security_evtx')
+                    if evtx_path:
+                        mapper.parse_evtx_file(evtx_path, vhd_id, watermarks=watermarks)
+
+                    # Name profiles that never logged on from SAM and NTUSER.DAT
+                    sam_path = manifest.find('sam_hive')
+                    if sam_path:
+                        mapper.parse_sam_hive(sam_path)
+                    for ntuser in manifest.find_all('ntuser'):
+                        mapper.parse_ntuser_hive(ntuser['path'], vhd_id, folder_name=ntuser['user'])
+
+                if not sessions:
+                    # Security.evtx plus the RDP session log when it was collected, from every OS volume
+                    for artifact in ['security_evtx', 'lsm_evtx']:
+                        for log in manifest.find_all(artifact):
+                            log_path = log['path']
+                            log_name = os.path.basename(log_path)
+                            self.progress.emit(f"Building logon sessions: {vhd_id} -> {log_name}")
+                            sessions_sorted.extend(session for session in session_builder.build(log_path, vhd_id)
+                                                   if session.start)
+
+        hive_cache.save()
+        mapper.save_state(state_path)
+        watermarks.save()
+        logger.info(f"Hive cache: {hive_cache.hits} hits, {hive_cache.misses} parsed")
+
+        mapper.export(os.path.join("workspace", f"integrated_sid_map.{self.export_format}"), fmt=self.export_format)
+        sessions_path = os.path.join("workspace", f"logon_sessions.{self.export_format}")
+        try:
+            total = export_rows(sessions_sorted, sessions_path, 'sessions', fmt=self.export_format)
+            logger.info(f"Logon sessions exported: {total} -> {sessions_path}")
+        except Exception as e:
+            logger.error(f"Session export error: {e}")
+            sessions_sorted.close()
+            sessions_path = None
 
         self.mapping_done.emit(mapper.master_map)
+        self.sessions_done.emit(sessions_path)
         self.finished.emit()
 
 
@@ -95,6 +321,8 @@ class VDIIntegratorGUI(QMainWindow):
         super().__init__()
         self.extracted_info = []
         self.user_to_folder_map = {}
+        # Exported logon sessions; load_sessions() into a SessionIndex for "who was on VM X at time T"
+        self.sessions_path = None
         self.setWindowTitle("VDI Artifact Integrator")
         self.setGeometry(100, 100, 1100, 700)
         self.init_ui()
@@ -137,6 +365,10 @@ class VDIIntegratorGUI(QMainWindow):
         self.chk_software.setChecked(True)
         self.chk_software.setEnabled(False)
 
+        self.combo_export = QComboBox()
+        # Parquet is only offered when pyarrow is installed
+        self.combo_export.addItems(available_formats())
+
         self.progress_bar = QProgressBar()
         self.log_output = QLabel("Ready")
         self.btn_start = QPushButton("Start Analysis")
@@ -147,6 +379,8 @@ class VDIIntegratorGUI(QMainWindow):
         opt_layout.addWidget(self.chk_edge)
         opt_layout.addWidget(self.chk_security)
         opt_layout.addWidget(self.chk_software)
+        opt_layout.addWidget(QLabel("Export Format:"))
+        opt_layout.addWidget(self.combo_export)
         opt_layout.addStretch()
         opt_layout.addWidget(self.log_output)
         opt_layout.addWidget(self.progress_bar)
@@ -235,9 +469,12 @@ class VDIIntegratorGUI(QMainWindow):
             selected_names.append("Edge History")
         if self.chk_security.isChecked():
             artifacts.append('Windows/System32/winevt/Logs/Security.evtx')
+            artifacts.append('Windows/System32/winevt/Logs/Microsoft-Windows-TerminalServices-LocalSessionManager%4Operational.evtx')
             selected_names.append("Security Logs")
         if self.chk_software.isChecked():
             artifacts.append('Windows/System32/config/SOFTWARE')
+            artifacts.append('Windows/System32/config/SAM')
+            artifacts.append('Users/*/NTUSER.DAT')
             selected_names.append("SOFTWARE Hive (Registry)")
 
         for i in range(self.tabs.count() - 1, 2, -1):
@@ -301,7 +538,7 @@ class VDIIntegratorGUI(QMainWindow):
         self.tabs.setCurrentIndex(1) 
         self.btn_start.setEnabled(False)
 
-        self.worker = AnalysisThread(vhd_paths, artifacts)
+        self.worker = AnalysisThread(vhd_paths, artifacts, self.combo_export.currentText())
         self.worker.item_processed.connect(self.add_result_row_and_tab)
         self.worker.progress.connect(self.log_output.setText)
         self.worker.vhd_done.connect(self.progress_bar.setValue)
@@ -317,36 +554,53 @@ class VDIIntegratorGUI(QMainWindow):
         table.setRowCount(0)
         
         parser = PrefetchParser(pecmd_path=os.path.join(os.getcwd(), "tools", "PECmd.exe"))
+        streams = []
 
         for info in self.extracted_info:
             workspace = info['workspace']
-            
-            input_dir = os.path.join(workspace, "Windows_Prefetch") 
             output_dir = os.path.join(workspace, "Analysis_Results")
 
-            if os.path.exists(input_dir):
-                pf_files = [f for f in os.listdir(input_dir) if f.lower().endswith('.pf')]
-                if not pf_files:
-                    continue
+            # The analysis run already parsed this image's prefetch in the background
+            parsed = stage_output(workspace, 'prefetch')
+            if parsed:
+                streams.append(read_rows(parsed))
+                continue
+
+            with WorkspaceManifest(workspace) as manifest:
+                pf_files = [f['path'] for f in manifest.find_all('prefetch') if f['path'].lower().endswith('.pf')]
+            if pf_files:
+                input_dir = os.path.dirname(pf_files[0])
 
                 self.log_output.setText(f"Analyzing with PECmd: {info['vhd_id']}")
                 if parser.execute_pecmd(input_dir, output_dir):
-                    parsed_data = parser.load_pecmd_csv(output_dir)
-                    
-                    for data in parsed_data:
-                        row = table.rowCount()
-                        table.insertRow(row)
-                        table.setItem(row, 0, QTableWidgetItem(data['timestamp']))
-                        table.setItem(row, 1, QTableWidgetItem(data['name']))
-                        table.setItem(row, 2, QTableWidgetItem(data['count']))
-                        table.setItem(row, 3, QTableWidgetItem(info['vhd_id']))
-        
-        table.setSortingEnabled(True)
-        table.sortItems(0, Qt.DescendingOrder)
+                    streams.append(tag_stream(parser.iter_pecmd_csv(output_dir), source=info['vhd_id']))
+
+        # Each VM's output is already newest-first, so a k-way merge gives the global order
+        table.setSortingEnabled(False)
+        fmt = self.combo_export.currentText()
+        total = 0
+        with ChunkedExporter(os.path.join("workspace", f"prefetch_timeline.{fmt}"), EXPORT_FIELDS['prefetch'], fmt=fmt) as exporter:
+            for data in merge_timelines(streams, key='timestamp'):
+                exporter.write(data)
+                total += 1
+                row = table.rowCount()
+                if row >= MAX_TABLE_ROWS:
+                    continue
+                table.insertRow(row)
+                table.setItem(row, 0, QTableWidgetItem(data['timestamp']))
+                table.setItem(row, 1, QTableWidgetItem(data['name']))
+                table.setItem(row, 2, QTableWidgetItem(data['count']))
+                table.setItem(row, 3, QTableWidgetItem(data['source']))
         
-        self.log_output.setText("Prefetch integrated analysis completed")
+        self.log_output.setText("Prefetch integrated analysis completed" + self._truncation_note(table, total, "prefetch_timeline", fmt))
         QMessageBox.information(self, "Completed", "Prefetch analysis and integration for all VHD images are complete.")
 
+    @staticmethod
+    def _truncation_note(table, total, export_name, fmt):
+        if total <= table.rowCount():
+            return ""
+        return f" (showing newest {table.rowCount()} of {total} rows; all rows in workspace/{export_name}.{fmt})"
+
     def on_analysis_finished(self, results):
         """Step 1: Called when image analysis and file extraction are complete"""
         self.btn_start.setEnabled(True)
@@ -362,9 +616,10 @@ class VDIIntegratorGUI(QMainWindow):
         self.btn_map_sid.setEnabled(False)
         self.log_output.setText("Starting SID mapping and log parsing...")
 
-        self.mapping_worker = MappingThread(self.extracted_info)
+        self.mapping_worker = MappingThread(self.extracted_info, self.combo_export.currentText())
         self.mapping_worker.progress.connect(self.log_output.setText)
         self.mapping_worker.mapping_done.connect(self.update_mapping_table)
+        self.mapping_worker.sessions_done.connect(self.on_sessions_built)
         self.mapping_worker.finished.connect(self.on_mapping_finished)
         self.mapping_worker.start()
 
@@ -413,11 +668,16 @@ class VDIIntegratorGUI(QMainWindow):
             return
 
         self.btn_map_sid.setEnabled(False)
-        self.mapping_worker = MappingThread(self.extracted_info)
+        self.mapping_worker = MappingThread(self.extracted_info, self.combo_export.currentText())
         self.mapping_worker.mapping_done.connect(self.update_mapping_table)
+        self.mapping_worker.sessions_done.connect(self.on_sessions_built)
         self.mapping_worker.finished.connect(lambda: self.btn_map_sid.setEnabled(True))
         self.mapping_worker.start()
 
+    def on_sessions_built(self, sessions_path):
+        """Remember where the logon sessions were exported; they are not kept in GUI memory"""
+        self.sessions_path = sessions_path
+
     def update_mapping_table(self, mapping_list):
         """Display parsed data in the table and update combo box for Edge analysis"""
         self.mapping_table.setRowCount(0)
@@ -450,7 +710,7 @@ class VDIIntegratorGUI(QMainWindow):
         self.mapping_table.setSortingEnabled(True)
         self.mapping_table.sortItems(0, Qt.DescendingOrder)
         
-        print(f"[DEBUG] Combo box update completed: {list(self.user_to_folder_map.keys())}")
+        logger.debug(f"Combo box update completed: {list(self.user_to_folder_map.keys())}")
 
     def run_targeted_edge_analysis(self):
         """Parse History within workspace based on entered folder name"""
@@ -468,45 +728,56 @@ class VDIIntegratorGUI(QMainWindow):
         self.edge_table.setRowCount(0)
         parser = EdgeHistoryParser()
 
-        # Filename pattern: Users_FolderName_AppData_Local_Microsoft_Edge_User_Data_Default_History
+        # Each workspace manifest maps (edge_history, user folder) to the extracted History file
         found_any = False
-        
+        streams = []
+
         # Iterate over extracted workspace information
         for info in self.extracted_info:
             workspace = info['workspace']
             vhd_id = info['vhd_id']
             
-            # TODO Handle spaces in folder names if necessary
-            target_filename = f"Users_{folder_name}_AppData_Local_Microsoft_Edge_User Data_Default\History"
-            file_path = os.path.join(workspace, target_filename)
-
-            print(f"[DEBUG] Attempting analysis path: {file_path}")
-            if os.path.exists(file_path):
-                print(f"[INFO] Analysis target found: {file_path}")
+            with WorkspaceManifest(workspace) as manifest:
+                file_path = manifest.find('edge_history', user=folder_name)
+            if file_path:
+                logger.info(f"Analysis target found: {file_path}")
                 self.log_output.setText(f"Analyzing: {folder_name}'s History")
-                
-                history_data = parser.parse(file_path)
-                
-                # Insert data into table
-                for data in history_data:
+                parsed = stage_output(workspace, 'edge')
+                if parsed:
+                    # The edge stage output holds every user, newest first
+                    streams.append(row for row in read_rows(parsed) if row['folder_name'].lower() == folder_name.lower())
+                else:
+                    streams.append(tag_stream(parser.iter_parse(file_path), source=vhd_id, folder_name=folder_name))
+                found_any = True
+
+        if found_any:
+            # Merge the per-VM histories (each newest-first) into one timeline
+            fmt = self.combo_export.currentText()
+            export_name = f"edge_history_{safe_filename(folder_name)}"
+            export_path = os.path.join("workspace", f"{export_name}.{fmt}")
+            total = 0
+            with ChunkedExporter(export_path, EXPORT_FIELDS['edge'], fmt=fmt) as exporter:
+                for data in merge_timelines(streams, key='time'):
+                    exporter.write(data)
+                    total += 1
                     row = self.edge_table.rowCount()
+                    if row >= MAX_TABLE_ROWS:
+                        continue
                     self.edge_table.insertRow(row)
                     self.edge_table.setItem(row, 0, QTableWidgetItem(data['time']))
                     self.edge_table.setItem(row, 1, QTableWidgetItem(folder_name))
                     self.edge_table.setItem(row, 2, QTableWidgetItem(data['title']))
                     self.edge_table.setItem(row, 3, QTableWidgetItem(data['url']))
-                    self.edge_table.setItem(row, 4, QTableWidgetItem(vhd_id))
-                found_any = True
+                    self.edge_table.setItem(row, 4, QTableWidgetItem(data['source']))
 
-        if found_any:
-            self.edge_table.setSortingEnabled(True)
-            self.edge_table.sortItems(0, Qt.DescendingOrder)
-            self.log_output.setText(f"{folder_name} analysis completed")
+            self.log_output.setText(f"{folder_name} analysis completed"
+                                    + self._truncation_note(self.edge_table, total, export_name, fmt))
         else:
             QMessageBox.critical(self, "Failure", 
-                f"Could not find the following file in the workspace:\n{target_filename}\n\nPlease verify the folder name in the 'User Mapping' tab.")
+                f"Could not find {folder_name}'s Edge History in the workspace manifests.\n\nPlease verify the folder name in the 'User Mapping' tab.")
 
 if __name__ == '__main__':
+    setup_logging()
     app = QApplication(sys.argv)
     gui = VDIIntegratorGUI()
     gui.show()
@@ -1,19 +1,29 @@
 import sqlite3
 import os
 import shutil
+import logging
 from datetime import datetime
+from src.core.records import EdgeVisit
+from src.core.metrics import metrics
+
+logger = logging.getLogger("ForensicAnalyzer")
 
 class EdgeHistoryParser:
     def parse(self, file_path):
         """Extract browsing history by reading the SQLite DB"""
-        results = []
+        return list(self.iter_parse(file_path))
+
+    def iter_parse(self, file_path):
+        """Stream browsing history rows, newest visit first"""
         if not os.path.exists(file_path):
-            return results
+            return
 
         # Since the DB might be in use, create a temporary copy for analysis
         temp_db = file_path + "_temp"
         shutil.copy2(file_path, temp_db)
 
+        conn = None
+        visits = 0
         try:
             conn = sqlite3.connect(temp_db)
             cursor = conn.cursor()
@@ -29,18 +39,14 @@ class EdgeHistoryParser:
             ORDER BY last_visit_time DESC
             """
             cursor.execute(query)
-            for row in cursor.fetchall():
-                results.append({
-                    'time': row[0],
-                    'title': row[1],
-                    'url': row[2],
-                    'count': row[3]
-                })
-            conn.close()
+            for row in cursor:
+                visits += 1
+                yield EdgeVisit(row[0], row[1], row[2], row[3])
         except Exception as e:
-            print(f"[ERROR] Error parsing Edge history: {e}")
+            logger.error(f"Error parsing Edge history: {e}")
         finally:
+            metrics.incr('edge_visits', visits)
+            if conn is not None:
+                conn.close()
             if os.path.exists(temp_db):
-                os.remove(temp_db)
-        
-        return results
\ No newline at end of file
+                os.remove(temp_db)
\ No newline at end of file
@@ -2,6 +2,12 @@ import subprocess
 import os
 import pandas as pd
 import glob
+import logging
+from src.core.records import PrefetchEntry
+from src.core.metrics import metrics
+from src.core.memory import SpillBuffer
+
+logger = logging.getLogger("ForensicAnalyzer")
 
 class PrefetchParser:
     def __init__(self, pecmd_path="tools/PECmd.exe"):
@@ -12,7 +18,7 @@ class PrefetchParser:
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        print(f"[INFO] Running PECmd: {self.pecmd_path} -d {input_dir} --csv {output_dir}")
+        logger.info(f"Running PECmd: {self.pecmd_path} -d {input_dir} --csv {output_dir}")
         cmd = [
             self.pecmd_path,
             "-d", input_dir,
@@ -23,25 +29,31 @@ class PrefetchParser:
             subprocess.run(cmd, check=True, capture_output=True)
             return True
         except Exception as e:
-            print(f"PECmd execution error: {e}")
+            logger.error(f"PECmd execution error: {e}")
             return False
 
     def load_pecmd_csv(self, output_dir):
         """Read the most recent CSV file generated"""
+        return list(self.iter_pecmd_csv(output_dir))
+
+    def iter_pecmd_csv(self, output_dir):
+        """Stream rows of the most recent CSV file, most recent run first"""
         # PECmd usually generates files in the format YYYYMMDDHHMMSS_PECmd_Output.csv
         csv_files = glob.glob(os.path.join(output_dir, "*_PECmd_Output.csv"))
         if not csv_files:
-            return []
+            return
 
         # Select the most recently created CSV file
         latest_csv = max(csv_files, key=os.path.getctime)
         
-        df = pd.read_csv(latest_csv)
-        results = []
-        for _, row in df.iterrows():
-            results.append({
-                'timestamp': str(row.get('LastRun', 'N/A')),
-                'name': str(row.get('ExecutableName', 'N/A')),
-                'count': str(row.get('RunCount', '0')),
-            })
-        return results
\ No newline at end of file
+        # Sorted through a SpillBuffer so a huge CSV spills to disk instead of filling memory
+        results = SpillBuffer(key='timestamp', reverse=True)
+        for df in pd.read_csv(latest_csv, chunksize=50000):
+            for _, row in df.iterrows():
+                results.add(PrefetchEntry(
+                    str(row.get('LastRun', 'N/A')),
+                    str(row.get('ExecutableName', 'N/A')),
+                    str(row.get('RunCount', '0')),
+                ))
+        metrics.incr('prefetch_entries', len(results))
+        yield from results
\ No newline at end of file
@@ -0,0 +1,44 @@
+import pytest
+
+from benchmarks.synthetic import (Fat16ImageBuilder, wrap_fixed_vhd, write_edge_history,
+                                  write_security_evtx)
+
+# Small enough to parse in a few seconds, large enough for several EVTX chunks
+EVTX_RECORDS = 1200
+
+
+@pytest.fixture(scope="session")
+def security_evtx(tmp_path_factory):
+    """Security.evtx with EVTX_RECORDS records; returns (path, number of 4624 logons)"""
+    path = str(tmp_path_factory.mktemp("evtx") / "Security.evtx")
+    logons = write_security_evtx(path, records=EVTX_RECORDS, users=8, seed=3)
+    return path, logons
+
+
+@pytest.fixture
+def evtx_factory(tmp_path):
+    """Write a Security.evtx into tmp_path; the same seed gives the same records"""
+    def make(name, records=EVTX_RECORDS, seed=3):
+        path = str(tmp_path / name)
+        write_security_evtx(path, records=records, users=8, seed=seed)
+        return path
+    return make
+
+
+@pytest.fixture(scope="session")
+def synthetic_vhd(tmp_path_factory, security_evtx):
+    """Fixed VHD holding a small FAT16 volume with prefetch files, Security.evtx and one Edge profile"""
+    root = tmp_path_factory.mktemp("image")
+    history = str(root / "History")
+    write_edge_history(history, visits=200, seed=3)
+
+    builder = Fat16ImageBuilder(size_mb=32, seed=3)
+    builder.add_file("Windows/System32/winevt/Logs/Security.evtx", source=security_evtx[0])
+    for i in range(5):
+        builder.add_file(f"Windows/Prefetch/APP{i:03d}.EXE-0000000{i}.pf", size=4096)
+    builder.add_file("Users/user00/NTUSER.DAT", size=64 * 1024)
+    builder.add_file("Users/user00/AppData/Local/Microsoft/Edge/User Data/Default/History", source=history)
+
+    raw = str(root / "synthetic.img")
+    builder.build(raw)
+    return wrap_fixed_vhd(raw, str(root / "synthetic.vhd"), seed=3)
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+pytest.importorskip("pytsk3")
+pytest.importorskip("pyvhdi")
+pytest.importorskip("PyQt5")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+
+from src.core.exporter import read_rows
+from src.core.job_queue import DONE, JobQueue
+from src.core.pipeline import stage_output
+from src.gui.main_window import AnalysisThread
+
+# Security Logs (both logs, the image only has Security.evtx) and Edge History
+ARTIFACTS = ['Windows/System32/winevt/Logs/Security.evtx',
+             'Windows/System32/winevt/Logs/Microsoft-Windows-TerminalServices-LocalSessionManager%4Operational.evtx',
+             'Users/*/AppData/Local/Microsoft/Edge/User Data/Default/History']
+
+
+@pytest.fixture(scope="module")
+def qt_app():
+    return QApplication.instance() or QApplication([])
+
+
+def run_analysis(vhd):
+    thread = AnalysisThread([vhd], ARTIFACTS, "csv")
+    finished = []
+    items = []
+    thread.finished.connect(finished.append)
+    thread.item_processed.connect(items.append)
+    thread._run()
+    return finished[0], items
+
+
+def test_analysis_extracts_and_parses(qt_app, synthetic_vhd, security_evtx, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    results, items = run_analysis(synthetic_vhd)
+
+    assert [result['vhd_id'] for result in results] == ["synthetic.vhd"]
+    workspace = results[0]['workspace']
+    failed = [item['artifact'] for item in items if item['status'] != "Success"]
+    assert all("LocalSessionManager" in artifact for artifact in failed)
+
+    sessions = stage_output(workspace, 'sessions')
+    edge = stage_output(workspace, 'edge')
+    assert sessions and edge
+    assert len(list(read_rows(sessions))) == security_evtx[1]
+    assert len(list(read_rows(edge))) == 200
+
+    queue = JobQueue(os.path.join("workspace", "jobs.db"))
+    try:
+        assert set(queue.counts()) == {DONE}
+    finally:
+        queue.close()
+    assert os.path.exists(os.path.join("workspace", "extraction_status.csv"))
+
+    # A second run over the same image only replays the recorded results
+    results, items = run_analysis(synthetic_vhd)
+    assert results[0]['workspace'] == workspace
+    extracted = [item for item in items if "(parsed)" not in item['artifact']]
+    assert extracted and all(item['message'].endswith("(previous run)") for item in extracted)
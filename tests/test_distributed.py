@@ -0,0 +1,59 @@
+from src.core.distributed import LeaseQueue
+
+
+def test_task_is_claimed_by_one_worker(tmp_path):
+    coordinator = LeaseQueue(str(tmp_path))
+    assert coordinator.publish({'id': 1, 'image': "a.vhd"})
+    # Already queued
+    assert not coordinator.publish({'id': 1, 'image': "a.vhd"})
+
+    worker_a = LeaseQueue(str(tmp_path))
+    worker_b = LeaseQueue(str(tmp_path))
+    assert worker_a.claim() == {'id': 1, 'image': "a.vhd"}
+    assert worker_b.claim() is None
+    # Still leased, so it is not published again
+    assert not coordinator.publish({'id': 1, 'image': "a.vhd"})
+
+
+def test_finished_results_are_collected_once(tmp_path):
+    queue = LeaseQueue(str(tmp_path))
+    queue.publish({'id': 1})
+    queue.publish({'id': 2})
+    for _ in range(2):
+        task = queue.claim()
+        queue.finish(task, {'id': task['id'], 'ok': True})
+
+    assert [result['id'] for result in queue.collect()] == [1, 2]
+    assert list(queue.collect()) == []
+    assert queue.claim() is None
+
+
+def test_expired_lease_returns_its_task(tmp_path):
+    coordinator = LeaseQueue(str(tmp_path), lease_timeout=0)
+    coordinator.publish({'id': 7})
+    LeaseQueue(str(tmp_path)).claim()
+
+    # The first sighting only starts the coordinator's clock for the lease
+    assert coordinator.expire() == []
+    assert coordinator.expire() == [{'id': 7}]
+    assert coordinator.publish({'id': 7})
+
+
+def test_heartbeat_keeps_lease_alive(tmp_path):
+    coordinator = LeaseQueue(str(tmp_path), lease_timeout=3600)
+    coordinator.publish({'id': 1})
+    worker = LeaseQueue(str(tmp_path))
+    task = worker.claim()
+
+    assert coordinator.expire() == []
+    worker.heartbeat(task)
+    assert coordinator.expire() == []
+
+
+def test_stop_flag(tmp_path):
+    queue = LeaseQueue(str(tmp_path))
+    assert not queue.stopped()
+    queue.stop()
+    assert queue.stopped()
+    queue.reset_stop()
+    assert not queue.stopped()
@@ -0,0 +1,88 @@
+import os
+
+from Evtx import Evtx as evtx_module
+
+from src.core.evtx_watermark import IncrementalReader, WatermarkStore
+from tests.conftest import EVTX_RECORDS
+
+
+def read_new(path, mark=None):
+    """(new record count, watermark, reader) of one incremental pass"""
+    with evtx_module.Evtx(path) as log:
+        reader = IncrementalReader(log, os.path.getsize(path), mark)
+        count = sum(1 for _ in reader.records())
+        return count, reader.watermark(), reader
+
+
+def test_first_pass_reads_everything(security_evtx):
+    count, mark, _ = read_new(security_evtx[0])
+    assert count == EVTX_RECORDS
+    assert mark['record_id'] == EVTX_RECORDS
+    assert mark['next_record'] == EVTX_RECORDS + 1
+
+
+def test_unchanged_log_skips_every_chunk(security_evtx):
+    _, mark, _ = read_new(security_evtx[0])
+    count, again, reader = read_new(security_evtx[0], mark)
+    assert count == 0
+    assert reader.skipped_chunks > 1
+    # Nothing new: the watermark stays where it was
+    assert again['record_id'] == mark['record_id']
+
+
+def test_grown_log_reads_only_new_records(evtx_factory):
+    path = evtx_factory("Security.evtx")
+    _, mark, _ = read_new(path)
+    # Same seed with more records: the old records are kept and 600 are appended
+    evtx_factory("Security.evtx", records=EVTX_RECORDS + 600)
+    count, grown, _ = read_new(path, mark)
+    assert count == 600
+    assert grown['record_id'] == EVTX_RECORDS + 600
+
+
+def test_replaced_log_is_read_again(evtx_factory):
+    path = evtx_factory("Security.evtx")
+    _, mark, _ = read_new(path)
+    # Same size and chunk layout, different records
+    evtx_factory("Security.evtx", seed=4)
+    count, _, _ = read_new(path, mark)
+    assert count == EVTX_RECORDS
+
+
+def test_watermark_without_fingerprint_is_not_trusted(security_evtx):
+    _, mark, _ = read_new(security_evtx[0])
+    del mark['record_crc']
+    count, _, _ = read_new(security_evtx[0], mark)
+    assert count == EVTX_RECORDS
+
+
+def test_all_records_flags_new_ones(evtx_factory):
+    path = evtx_factory("Security.evtx")
+    _, mark, _ = read_new(path)
+    evtx_factory("Security.evtx", records=EVTX_RECORDS + 100)
+    with evtx_module.Evtx(path) as log:
+        reader = IncrementalReader(log, os.path.getsize(path), mark)
+        flags = [new for _, new in reader.all_records()]
+    assert len(flags) == EVTX_RECORDS + 100
+    assert flags.count(True) == 100
+    assert not any(flags[:EVTX_RECORDS])
+
+
+def test_store_round_trip(tmp_path):
+    store_path = str(tmp_path / "marks" / "evtx_watermarks.json")
+    store = WatermarkStore(store_path)
+    assert store.get("VM01", "Security.evtx") is None
+    store.set("VM01", "Security.evtx", {'record_id': 5})
+    store.save()
+
+    store = WatermarkStore(store_path)
+    assert store.get("VM01", "Security.evtx") == {'record_id': 5}
+    assert store.get("VM02", "Security.evtx") is None
+    store.clear()
+    assert store.get("VM01", "Security.evtx") is None
+
+
+def test_unreadable_store_is_ignored(tmp_path):
+    store_path = tmp_path / "evtx_watermarks.json"
+    store_path.write_text("{not json")
+    assert WatermarkStore(str(store_path)).get("VM01", "Security.evtx") is None
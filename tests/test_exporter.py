@@ -0,0 +1,58 @@
+import pytest
+
+from src.core.exporter import ChunkedExporter, available_formats, export_rows, read_rows, safe_filename
+from src.core.records import LogonSession
+
+FIELDS = ['time', 'name', 'count']
+
+
+@pytest.mark.parametrize("fmt", available_formats())
+def test_round_trip(tmp_path, fmt):
+    path = str(tmp_path / f"rows.{fmt}")
+    rows = [{'time': f"2024-01-01 00:00:{i % 60:02d}", 'name': f"APP{i}.EXE", 'count': str(i)}
+            for i in range(25)]
+    with ChunkedExporter(path, FIELDS, chunk_size=10) as exporter:
+        exporter.write_rows(rows)
+        # Extra keys are not exported
+        exporter.write({'time': "2024-01-02 00:00:00", 'name': "LAST.EXE", 'count': "0", 'extra': "x"})
+    assert exporter.rows_written == 26
+
+    back = list(read_rows(path))
+    assert len(back) == 26
+    assert back[0] == rows[0]
+    assert set(back[-1]) == set(FIELDS)
+
+
+@pytest.mark.parametrize("fmt", available_formats())
+def test_empty_export_still_writes_a_file(tmp_path, fmt):
+    path = str(tmp_path / f"empty.{fmt}")
+    assert export_rows([], path, 'prefetch', fmt=fmt) == 0
+    assert list(read_rows(path)) == []
+
+
+def test_export_record_objects(tmp_path):
+    path = str(tmp_path / "sessions.csv")
+    session = LogonSession("VM01", "alice", "S-1-5-21-1", "CORP", "0x1", "10", None,
+                           status="no_logoff", reconnects=2)
+    assert export_rows([session], path, 'sessions') == 1
+    row = next(read_rows(path))
+    assert row['user'] == "alice"
+    assert row['reconnects'] == "2"
+
+
+def test_unsupported_format(tmp_path):
+    with pytest.raises(ValueError):
+        ChunkedExporter(str(tmp_path / "rows.xml"), FIELDS)
+    with pytest.raises(ValueError):
+        list(read_rows(str(tmp_path / "rows.xml")))
+
+
+def test_safe_filename():
+    assert safe_filename("../../etc/passwd") == "_.._etc_passwd"
+    assert safe_filename("VM 01:prefetch") == "VM_01_prefetch"
+    assert safe_filename("") == "_"
+
+
+def test_available_formats():
+    formats = available_formats()
+    assert formats[:2] == ['csv', 'jsonl']
@@ -0,0 +1,112 @@
+import os
+
+from src.core.job_queue import JobQueue, DEAD, FAILED, PENDING, RUNNING, image_identity
+
+
+def make_queue(tmp_path, **kwargs):
+    return JobQueue(str(tmp_path / "jobs.db"), **kwargs)
+
+
+def test_claim_takes_each_task_once(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.add("a.vhd", "Windows/Prefetch")
+    queue.add("a.vhd", "Windows/Prefetch")  # duplicate is ignored
+    queue.add("b.vhd", "Windows/Prefetch")
+
+    first = queue.claim("extract")
+    second = queue.claim("extract")
+    assert (first['image'], second['image']) == ("a.vhd", "b.vhd")
+    assert queue.claim("extract") is None
+    assert queue.counts("extract") == {RUNNING: 2}
+
+    queue.complete(first, [{'path': 'x', 'success': True}])
+    assert queue.is_done("a.vhd", "Windows/Prefetch")
+    assert queue.result(queue.get("a.vhd", "Windows/Prefetch")) == [{'path': 'x', 'success': True}]
+    queue.close()
+
+
+def test_claim_filters_by_image_and_stage(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.add("a.vhd", "Windows/Prefetch")
+    queue.add("a.vhd", "", "prefetch")
+    queue.add("b.vhd", "Windows/Prefetch")
+
+    assert queue.claim("extract", images=["b.vhd"])['image'] == "b.vhd"
+    assert queue.claim("prefetch")['stage'] == "prefetch"
+    assert queue.claim("extract", images=["b.vhd"]) is None
+    queue.close()
+
+
+def test_fail_backs_off_then_goes_dead(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2, backoff_base=60)
+    queue.add("a.vhd", "Windows/Prefetch")
+
+    task = queue.claim()
+    assert queue.fail(task, "read error") == FAILED
+    # Not due yet
+    assert queue.claim() is None
+    assert 0 < queue.next_retry_in() <= 60
+
+    queue.conn.execute("UPDATE tasks SET next_attempt = 0")
+    task = queue.claim()
+    assert task['attempts'] == 1
+    assert queue.fail(task, "read error") == DEAD
+    assert queue.next_retry_in() is None
+    queue.close()
+
+
+def test_permanent_failure_is_dead_at_once(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=5)
+    queue.add("a.vhd", "Windows/Prefetch")
+    assert queue.fail(queue.claim(), "no filesystem", permanent=True) == DEAD
+    queue.close()
+
+
+def test_recover_requeues_running_tasks(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.add("a.vhd", "Windows/Prefetch")
+    queue.claim()
+    queue.close()
+
+    queue = make_queue(tmp_path)
+    assert queue.recover() == 1
+    assert queue.get("a.vhd", "Windows/Prefetch")['status'] == PENDING
+    queue.close()
+
+
+def test_reset_only_touches_given_images(tmp_path):
+    queue = make_queue(tmp_path)
+    for image in ("a.vhd", "b.vhd"):
+        queue.add(image, "Windows/Prefetch")
+        queue.fail(queue.claim(), "broken", permanent=True)
+
+    queue.reset(images=["a.vhd"])
+    assert queue.get("a.vhd", "Windows/Prefetch")['status'] == PENDING
+    assert queue.get("a.vhd", "Windows/Prefetch")['attempts'] == 0
+    assert queue.get("b.vhd", "Windows/Prefetch")['status'] == DEAD
+    queue.close()
+
+
+def test_changed_image_starts_tasks_over(tmp_path):
+    image = tmp_path / "a.vhd"
+    image.write_bytes(b"first")
+    queue = make_queue(tmp_path)
+    queue.add(str(image), "Windows/Prefetch", image_id=image_identity(str(image)))
+    queue.complete(queue.claim(), [{'path': 'old', 'success': True}])
+
+    # Same image again: the finished task is kept
+    queue.add(str(image), "Windows/Prefetch", image_id=image_identity(str(image)))
+    assert queue.is_done(str(image), "Windows/Prefetch")
+
+    # Evidence re-collected to the same path
+    image.write_bytes(b"second image")
+    os.utime(image, ns=(1, 1))
+    queue.add(str(image), "Windows/Prefetch", image_id=image_identity(str(image)))
+    task = queue.get(str(image), "Windows/Prefetch")
+    assert task['status'] == PENDING
+    assert queue.result(task) is None
+    queue.close()
+
+
+def test_image_identity_of_missing_file(tmp_path):
+    assert image_identity(str(tmp_path / "missing.vhd")) is None
@@ -0,0 +1,59 @@
+import os
+
+from src.core.manifest import WorkspaceManifest
+
+
+def test_record_and_find(tmp_path):
+    workspace = str(tmp_path / "ws")
+    with WorkspaceManifest(workspace) as manifest:
+        manifest.record("Windows/System32/winevt/Logs/Security.evtx",
+                        os.path.join(workspace, "Security.evtx"), 100)
+        manifest.record("/Users/alice/NTUSER.DAT", os.path.join(workspace, "alice_NTUSER.DAT"), 10)
+        manifest.record("/Users/bob/NTUSER.DAT", os.path.join(workspace, "bob_NTUSER.DAT"), 10)
+        # Rows are batched; extraction flushes after every target
+        manifest.flush()
+
+        assert manifest.find('security_evtx') == os.path.join(workspace, "Security.evtx")
+        assert [row['user'] for row in manifest.find_all('ntuser')] == ["alice", "bob"]
+        assert manifest.find('ntuser', user="BOB") == os.path.join(workspace, "bob_NTUSER.DAT")
+        assert manifest.find('sam_hive') is None
+        assert manifest.users('ntuser') == ["alice", "bob"]
+
+    # Rows survive a reopen
+    with WorkspaceManifest(workspace) as manifest:
+        assert len(manifest.find_all('ntuser')) == 2
+
+
+def test_primary_volume_wins(tmp_path):
+    workspace = str(tmp_path / "ws")
+    with WorkspaceManifest(workspace) as manifest:
+        manifest.record("/Windows/System32/winevt/Logs/Security.evtx",
+                        os.path.join(workspace, "vol2", "Security.evtx"), 1, volume="vol2")
+        manifest.record("/Windows/System32/winevt/Logs/Security.evtx",
+                        os.path.join(workspace, "Security.evtx"), 1)
+        manifest.flush()
+        assert manifest.find('security_evtx') == os.path.join(workspace, "Security.evtx")
+        assert len(manifest.find_all('security_evtx')) == 2
+
+
+def test_claim_path_rejects_a_second_owner(tmp_path):
+    workspace = str(tmp_path / "ws")
+    saved = os.path.join(workspace, "Users_alice_NTUSER.DAT")
+    with WorkspaceManifest(workspace) as manifest:
+        assert manifest.claim_path(saved, "Users/alice/NTUSER.DAT")
+        assert manifest.claim_path(saved, "\\Users\\alice\\NTUSER.DAT")
+        assert not manifest.claim_path(saved, "Users/alice/NTUSER.DAT", volume="vol2")
+        manifest.record("Users/alice/NTUSER.DAT", saved, 10)
+
+    # Owned by an earlier run's row
+    with WorkspaceManifest(workspace) as manifest:
+        assert not manifest.claim_path(saved, "Users/alice_NTUSER.DAT")
+        assert manifest.claim_path(saved, "/Users/alice/NTUSER.DAT")
+
+
+def test_last_extracted_includes_unflushed_rows(tmp_path):
+    workspace = str(tmp_path / "ws")
+    with WorkspaceManifest(workspace, batch_size=100) as manifest:
+        assert manifest.last_extracted() is None
+        manifest.record("/Windows/Prefetch/APP.EXE-1.pf", os.path.join(workspace, "APP.EXE-1.pf"), 1)
+        assert manifest.last_extracted() is not None
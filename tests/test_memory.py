@@ -0,0 +1,68 @@
+import os
+import random
+
+from src.core.memory import MB, MemoryBudget, SpillBuffer
+
+
+def test_budget_reserve_and_release():
+    memory = MemoryBudget(limit=10 * MB)
+    assert memory.reserve(6 * MB)
+    assert not memory.reserve(6 * MB)
+    assert memory.reserve(6 * MB, force=True)
+    assert memory.available() == 0
+    memory.release(12 * MB)
+    assert memory.available() == 10 * MB
+    assert memory.status()['peak_mb'] == 12
+
+
+def test_set_limit():
+    memory = MemoryBudget(limit=10 * MB)
+    memory.set_limit(MB)
+    assert not memory.reserve(2 * MB)
+
+
+def rows(count, seed=0):
+    rng = random.Random(seed)
+    return [{'time': f"2024-01-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00", 'n': i}
+            for i in range(count)]
+
+
+def test_spill_buffer_sorts_in_memory(tmp_path):
+    data = rows(100)
+    buffer = SpillBuffer(spill_dir=str(tmp_path), memory=MemoryBudget(limit=64 * MB))
+    buffer.extend(data)
+    assert not buffer._runs
+    result = list(buffer)
+    assert [row['time'] for row in result] == sorted((row['time'] for row in data), reverse=True)
+
+
+def test_spill_buffer_spills_and_merges(tmp_path):
+    data = rows(2000, seed=1)
+    memory = MemoryBudget(limit=64 * MB)
+    buffer = SpillBuffer(max_bytes=20000, spill_dir=str(tmp_path), memory=memory)
+    buffer.extend(data)
+    assert len(buffer) == 2000
+    assert len(buffer._runs) > 1
+
+    result = list(buffer)
+    assert [row['time'] for row in result] == sorted((row['time'] for row in data), reverse=True)
+    assert sorted(row['n'] for row in result) == list(range(2000))
+    # Runs are deleted and the reservation returned
+    assert os.listdir(tmp_path) == []
+    assert memory.used == 0
+
+
+def test_spill_buffer_spills_when_budget_is_spent(tmp_path):
+    memory = MemoryBudget(limit=4096)
+    buffer = SpillBuffer(key=lambda row: row['n'], reverse=False, spill_dir=str(tmp_path), memory=memory)
+    buffer.extend({'n': n} for n in reversed(range(200)))
+    assert buffer._runs
+    assert [row['n'] for row in buffer] == list(range(200))
+
+
+def test_spill_buffer_close_removes_runs(tmp_path):
+    buffer = SpillBuffer(max_bytes=1000, spill_dir=str(tmp_path), memory=MemoryBudget(limit=64 * MB))
+    buffer.extend(rows(200))
+    assert os.listdir(tmp_path)
+    buffer.close()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,62 @@
+import os
+import random
+
+from src.core.metrics import metrics
+from src.core.readahead import ReadAheadReader
+
+BLOCK = 64 * 1024
+
+
+def open_reader(path, **kwargs):
+    return ReadAheadReader(open(path, 'rb'), os.path.getsize(path), open(path, 'rb'),
+                           block_size=BLOCK, cache_blocks=16, **kwargs)
+
+
+def test_sequential_reads_match_the_file(synthetic_vhd):
+    with open(synthetic_vhd, 'rb') as f:
+        expected = f.read(4 * 1024 * 1024)
+    metrics.reset()
+    reader = open_reader(synthetic_vhd)
+    try:
+        # Reads that straddle block boundaries, like a filesystem walking a large file
+        data = b"".join(reader.read(offset, 10000) for offset in range(0, len(expected), 10000))
+    finally:
+        reader.close()
+        reader.handle.close()
+    assert data[:len(expected)] == expected
+    assert metrics.counters['readahead_hits'] > 0
+    assert metrics.counters['readahead_prefetched_bytes'] > 0
+
+
+def test_random_reads_bypass_the_cache(synthetic_vhd):
+    size = os.path.getsize(synthetic_vhd)
+    rng = random.Random(0)
+    metrics.reset()
+    reader = open_reader(synthetic_vhd)
+    try:
+        with open(synthetic_vhd, 'rb') as f:
+            for _ in range(50):
+                offset = rng.randrange(size - 4096)
+                f.seek(offset)
+                assert reader.read(offset, 4096) == f.read(4096)
+    finally:
+        reader.close()
+        reader.handle.close()
+    assert metrics.counters['readahead_prefetched_bytes'] == 0
+
+
+def test_read_at_the_end_of_the_image(synthetic_vhd):
+    size = os.path.getsize(synthetic_vhd)
+    with open(synthetic_vhd, 'rb') as f:
+        head = f.read(512)
+        f.seek(size - 3 * BLOCK)
+        expected = f.read()
+    reader = open_reader(synthetic_vhd)
+    try:
+        data = b"".join(reader.read(offset, 4096) for offset in range(size - 3 * BLOCK, size, 4096))
+    finally:
+        reader.close()
+    assert data == expected
+    # After close, reads go straight to the handle
+    assert reader.read(0, 512) == head
+    reader.handle.close()
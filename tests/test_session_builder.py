@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+from src.core.exporter import export_rows
+from src.core.session_builder import SessionBuilder, SessionIndex, load_sessions
+
+START = datetime(2024, 1, 1, 8, 0, 0)
+
+
+def at(minutes):
+    return START + timedelta(minutes=minutes)
+
+
+def logon(minutes, logon_id, user="alice"):
+    return "4624", at(minutes), {
+        'TargetUserName': user, 'TargetUserSid': "S-1-5-21-1-2-3-1001", 'TargetDomainName': "CORP",
+        'TargetLogonId': logon_id, 'LogonType': "10", 'IpAddress': "10.0.0.5"}
+
+
+def logoff(minutes, logon_id, user="alice"):
+    return "4634", at(minutes), {
+        'TargetUserName': user, 'TargetUserSid': "S-1-5-21-1-2-3-1001", 'TargetDomainName': "CORP",
+        'TargetLogonId': logon_id, 'LogonType': "10"}
+
+
+def build(events, max_open=10000):
+    return list(SessionBuilder(max_open=max_open).build_events(events, "VM01", "Security.evtx"))
+
+
+def test_logon_and_logoff_pair_up():
+    sessions = build([logon(0, "0x1"), logon(1, "0x2", user="bob"), logoff(5, "0x1"), logoff(9, "0x2", user="bob")])
+    assert [(s.user, s.start, s.end, s.status) for s in sessions] == [
+        ("alice", at(0), at(5), "complete"),
+        ("bob", at(1), at(9), "complete"),
+    ]
+
+
+def test_open_sessions_are_clamped_to_the_last_event():
+    sessions = build([logon(0, "0x1"), logon(3, "0x2")])
+    assert [(s.logon_id, s.end, s.status) for s in sessions] == [("0x1", at(3), "no_logoff"),
+                                                               ("0x2", at(3), "no_logoff")]
+
+
+def test_logoff_before_the_log_started():
+    sessions = build([logon(2, "0x2"), logoff(4, "0x1"), logoff(6, "0x2")])
+    assert (sessions[0].logon_id, sessions[0].start, sessions[0].status) == ("0x1", at(2), "no_logon")
+    assert sessions[1].status == "complete"
+
+
+def test_reused_logon_id_closes_the_previous_session():
+    sessions = build([logon(0, "0x1"), logon(7, "0x1"), logoff(8, "0x1")])
+    assert [(s.start, s.end, s.status) for s in sessions] == [(at(0), at(7), "no_logoff"),
+                                                             (at(7), at(8), "complete")]
+
+
+def test_machine_and_system_accounts_are_skipped():
+    machine = logon(0, "0x1", user="VDI01$")
+    system = ("4624", at(1), {'TargetUserName': "SYSTEM", 'TargetUserSid': "S-1-5-18",
+                              'TargetDomainName': "NT AUTHORITY", 'TargetLogonId': "0x3e7"})
+    assert build([machine, system]) == []
+
+
+def test_eviction_caps_open_sessions():
+    rdp = ("4778", at(2), {'LogonID': "0x1", 'ClientAddress': "10.0.0.9"})
+    sessions = build([logon(0, "0x1"), rdp, logon(3, "0x2"), logon(4, "0x3"), logoff(9, "0x1")], max_open=2)
+
+    evicted = sessions[0]
+    assert (evicted.logon_id, evicted.status) == ("0x1", "evicted_inferred")
+    # Its end is the last event seen for it, and the late logoff does not emit it twice
+    assert evicted.end == at(2)
+    assert evicted.reconnects == 1
+    assert evicted.client == "10.0.0.9"
+    assert [(s.logon_id, s.status) for s in sessions[1:]] == [("0x2", "no_logoff"), ("0x3", "no_logoff")]
+
+
+def test_sessions_from_a_synthetic_log(security_evtx):
+    path, logons = security_evtx
+    sessions = list(SessionBuilder().build(path, "VM01"))
+    assert len(sessions) == logons
+    assert {s.status for s in sessions} <= {"complete", "no_logoff"}
+    assert all(s.start <= s.end for s in sessions)
+    assert list(SessionBuilder().build(path + ".missing", "VM01")) == []
+
+
+def test_exported_sessions_load_back_into_an_index(tmp_path):
+    sessions = build([logon(0, "0x1"), logon(10, "0x2", user="bob"), logoff(20, "0x1"), logoff(30, "0x2", user="bob")])
+    path = str(tmp_path / "sessions.csv")
+    export_rows(sessions, path, 'sessions')
+
+    loaded = list(load_sessions(path))
+    assert loaded == sessions
+
+    index = SessionIndex(loaded)
+    assert [s.user for s in index.who("VM01", at(15))] == ["alice", "bob"]
+    assert [s.user for s in index.who("VM01", at(25))] == ["bob"]
+    assert index.who("VM01", at(40)) == []
+    assert index.who("VM02", at(15)) == []
@@ -0,0 +1,41 @@
+from src.core.timeline_merge import merge_timelines, tag_stream, time_key
+
+
+def stream(*times):
+    return ({'time': t} for t in times)
+
+
+def test_merge_newest_first():
+    merged = merge_timelines([stream("2024-01-03", "2024-01-01"),
+                              stream("2024-01-04", "2024-01-02"),
+                              stream()])
+    assert [row['time'] for row in merged] == ["2024-01-04", "2024-01-03", "2024-01-02", "2024-01-01"]
+
+
+def test_merge_oldest_first_with_custom_key():
+    merged = merge_timelines([iter([1, 4, 9]), iter([2, 3, 10])], key=lambda n: n, reverse=False)
+    assert list(merged) == [1, 2, 3, 4, 9, 10]
+
+
+def test_missing_times_sort_oldest():
+    merged = merge_timelines([stream("2024-01-02", "N/A"), stream("2024-01-01", "")])
+    times = [row['time'] for row in merged]
+    assert times[:2] == ["2024-01-02", "2024-01-01"]
+    assert set(times[2:]) == {"N/A", ""}
+    assert time_key(None) == time_key("nan") == ""
+
+
+def test_merge_is_lazy():
+    def endless():
+        n = 0
+        while True:
+            yield {'time': f"{9999 - n:04d}"}
+            n += 1
+
+    merged = merge_timelines([endless(), stream("5000")])
+    assert next(merged)['time'] == "9999"
+
+
+def test_tag_stream():
+    rows = list(tag_stream(stream("2024-01-01"), vhd="VM01"))
+    assert rows == [{'time': "2024-01-01", 'vhd': "VM01"}]